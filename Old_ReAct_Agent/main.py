@@ -1,26 +1,66 @@
+import contextlib
 import os
-from typing import List
-
-from callbacks import AgentCallbackHandler
+from typing import List, Union
+
+from agent_common.callbacks import AgentCallbackHandler, MetricsCallbackHandler
+from agent_common.http_clients import (get_http_client, pool_stats,
+                                       rate_limit_stats)
+from agent_common.llm_cache import LLMResponseCache
+from agent_common.loop_guard import (LoopGuard, ToolMemo, loop_stats,
+                                     repeat_note)
+from agent_common.tool_registry import ToolRegistry
 from dotenv import load_dotenv
 from langchain_classic.agents.format_scratchpad import format_log_to_str
 from langchain_classic.agents.output_parsers import \
     ReActSingleInputOutputParser
 from langchain_classic.schema import AgentAction, AgentFinish
-from langchain_classic.tools import Tool
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
 from langchain_core.prompts import PromptTemplate
-from langchain_core.tools import render_text_description, tool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 
 load_dotenv()
 
 AUTH_CODE = os.getenv("AUTH_CODE")
 BASE_URL = os.getenv("BASE_URL")
+VERBOSE = os.getenv("AGENT_VERBOSE", "").lower() in ("1", "true", "yes")
+USE_STOP = os.getenv("REACT_USE_STOP", "1") == "1"
+# Stream completions and apply the stop sequences on the client, for
+# endpoints that ignore ``stop``. Off by default: with REACT_USE_STOP the
+# provider already ends the completion at the Observation.
+STREAM_EARLY_STOP = os.getenv("REACT_STREAM_EARLY_STOP", "0") == "1"
+
+STOP_SEQUENCES = ["\nObservation:", "Observation:"]
 
 AZURE_ENDPOINT = os.getenv("azure_endpoint")
 API_KEY = os.getenv("api_key")
 API_VERSION = os.getenv("azure_api_version")
 
+# Tool descriptions and format instructions are fixed for a registry, so they
+# form a prefix that is identical on every request and can be served from the
+# provider's prompt cache; only the question and scratchpad at the end vary.
+REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought: {agent_scratchpad}"""
+
 
 @tool
 def get_text_length(text: str) -> int:
@@ -33,51 +73,101 @@ def get_text_length(text: str) -> int:
     return len(text)
 
 
-def find_tool_by_name(tools: List[tool], tool_name: str) -> Tool:
-    for tool in tools:
-        if tool.name == tool_name:
-            return tool
-    raise ValueError(f"Tool with name {tool_name} not found.")
+class IncrementalScratchpad:
+    """Builds the same text as ``format_log_to_str`` one step at a time."""
 
+    def __init__(self):
+        self.text = ""
 
-def main():
+    def append(self, action: AgentAction, observation: str) -> None:
+        self.text += format_log_to_str([(action, observation)])
 
-    tools = [get_text_length]
+    def __str__(self) -> str:
+        return self.text
 
-    tempalte = """
-        Answer the following questions as best you can. You have access to the following tools:
 
-        {tools}
+class ClientStopChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that ends streamed completions at ``client_stop`` itself.
+
+    Closing the stream drops the HTTP response, so the provider stops
+    generating instead of hallucinating an Observation and further steps.
+    Built with ``streaming=True``, ``invoke`` goes through this stream and
+    still uses the LLM cache and callbacks like any other call.
+    """
 
-        Use the following format:
+    client_stop: List[str] = []
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if not self.client_stop:
+            yield from chunks
+            return
+
+        text = sent = ""
+        with contextlib.closing(chunks):
+            for chunk in chunks:
+                text += chunk.message.text
+                cut = min(
+                    (i for i in map(text.find, self.client_stop) if i != -1),
+                    default=None,
+                )
+                # Hold back a tail that may be the start of a stop sequence.
+                end = len(text) - self._partial_stop(text) if cut is None else cut
+                yield ChatGenerationChunk(
+                    message=chunk.message.model_copy(
+                        update={"content": text[len(sent) : end]}
+                    ),
+                    generation_info=chunk.generation_info,
+                )
+                sent = text[:end]
+                if cut is not None:
+                    return
+        if text != sent:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[len(sent) :]))
+
+    def _partial_stop(self, text: str) -> int:
+        """Length of the longest end of ``text`` that starts a stop sequence."""
+
+        return max(
+            (
+                n
+                for stop in self.client_stop
+                for n in range(1, len(stop))
+                if text.endswith(stop[:n])
+            ),
+            default=0,
+        )
 
-        Question: the input question you must answer
-        Thought: you should always think about what to do
-        Action: the action to take, should be one of [{tool_names}]
-        Action Input: the input to the action
-        Observation: the result of the action
-        ... (this Thought/Action/Action Input/Observation can repeat N times)
-        Thought: I now know the final answer
-        Final Answer: the final answer to the original input question
 
-        Begin!
+def main():
 
-        Question: {input}
-        Thought: {agent_scratchpad}
-    """
+    registry = ToolRegistry([get_text_length], pure=["get_text_length"])
 
-    prompt = PromptTemplate.from_template(template=tempalte).partial(
-        tools=render_text_description(tools),
-        tool_names=", ".join([tool.name for tool in tools]),
+    prompt = PromptTemplate.from_template(template=REACT_TEMPLATE).partial(
+        tools=registry.text_description(),
+        tool_names=registry.tool_names(),
     )
 
-    llm = ChatOpenAI(
+    llm_cache = LLMResponseCache()
+
+    callbacks = [MetricsCallbackHandler()]
+    if VERBOSE:
+        callbacks.append(AgentCallbackHandler())
+    # Passed per call, so LLM and tool steps report to the same handlers.
+    config: RunnableConfig = {"callbacks": callbacks}
+
+    llm = ClientStopChatOpenAI(
+        client_stop=STOP_SEQUENCES if STREAM_EARLY_STOP else [],
+        streaming=STREAM_EARLY_STOP,
         temperature=0,
-        # stop=["Observation:", "Observation:\n"],
+        stop=STOP_SEQUENCES if USE_STOP else None,
         base_url=BASE_URL,
         api_key=AUTH_CODE,
         model="gpt-oss-120b",
-        callbacks=[AgentCallbackHandler()],
+        cache=llm_cache,
+        http_client=get_http_client(),
+        # The shared rate limiter retries; SDK retries would multiply its attempts.
+        max_retries=0,
         extra_body={
             "reasoning": {
                 "effort": "high",  # "low" | "medium" | "high"
@@ -95,42 +185,64 @@ def main():
     #     callbacks=[AgentCallbackHandler()],
     # )
 
-    intermediate_steps = []
+    scratchpad = IncrementalScratchpad()
 
-    agent = (
-        {
-            "input": lambda x: x["input"],
-            "agent_scratchpad": lambda x: format_log_to_str(x["agent_scratchpad"]),
-        }
-        | prompt
-        | llm
-        | ReActSingleInputOutputParser()
-    )
+    output_parser = ReActSingleInputOutputParser()
+
+    agent = prompt | llm | output_parser
 
     agent_step = ""
+    guard = LoopGuard()
+    memo = ToolMemo(registry.is_pure)
 
     while not isinstance(agent_step, AgentFinish):
+        stop_reason = guard.over_budget()
+        if stop_reason:
+            print(f"Agent stopped: {stop_reason}")
+            break
+
+        agent_input = {
+            "input": "What is the length of the word: dog",
+            "agent_scratchpad": str(scratchpad),
+        }
         agent_step: Union[AgentAction, AgentFinish] = agent.invoke(
-            {
-                "input": "What is the length of the word: dog",
-                "agent_scratchpad": intermediate_steps,
-            }
+            agent_input, config=config
         )
 
         print(agent_step)
 
         if isinstance(agent_step, AgentAction):
             tool_name = agent_step.tool
-            tool_to_use = find_tool_by_name(tools, tool_name)
             tool_input = agent_step.tool_input
-            observation = tool_to_use.run(tool_input)
+            stop_reason, (repeated,) = guard.check_actions([(tool_name, tool_input)])
+            if stop_reason:
+                print(f"Agent stopped: {stop_reason}")
+                break
+            try:
+                tool_to_use = registry.get(tool_name)
+            except ValueError as e:
+                # An unknown (e.g. hallucinated) tool name: list the real ones.
+                observation = f"{e} Available tools: {registry.tool_names()}."
+            else:
+                observation = memo.call(
+                    tool_name,
+                    tool_input,
+                    lambda: tool_to_use.run(tool_input, callbacks=callbacks),
+                )
+            if repeated:
+                observation = f"{observation}\n{repeat_note(tool_name)}"
             print(f"{observation=}")
 
-            intermediate_steps.append((agent_step, str(observation)))
+            scratchpad.append(agent_step, str(observation))
 
     if isinstance(agent_step, AgentFinish):
         print(agent_step.return_values)
 
+    print(f"LLM cache: {llm_cache.stats()}")
+    print(f"HTTP pool: {pool_stats()}")
+    print(f"Rate limiter: {rate_limit_stats()}")
+    print(f"Loop guard: {loop_stats()}")
+
 
 if __name__ == "__main__":
     main()
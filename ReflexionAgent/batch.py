@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from checkpoints import (CHECKPOINT_DB_PATH, async_sqlite_checkpointer,
+                         is_finished, new_input, run_config)
+from convergence import convergence_stats
+from langchain_core.messages import AIMessage
+from reflexion_graph import build_graph, get_graph
+from routing import route_stats
+
+
+def load_questions(path: str) -> list[dict]:
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "question" not in record:
+                raise ValueError(f"{path}:{line_no} has no 'question' field")
+            record.setdefault("id", str(line_no))
+            record["id"] = str(record["id"])
+            questions.append(record)
+    return questions
+
+
+def load_done_ids(path: str) -> set[str]:
+    """IDs that already have a successful result in the output file."""
+
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line.
+                continue
+            if not record.get("error"):
+                done.add(str(record["id"]))
+    return done
+
+
+def final_answer(messages) -> dict:
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and message.tool_calls:
+            args = message.tool_calls[0]["args"]
+            return {
+                "answer": args.get("answer"),
+                "references": args.get("references", []),
+            }
+    return {"answer": None, "references": []}
+
+
+async def run_one(record: dict, semaphore: asyncio.Semaphore, graph) -> dict:
+    async with semaphore:
+        started = time.perf_counter()
+        config = run_config(
+            f"batch:{record['id']}" if graph.checkpointer else None,
+            run_name=f"batch:{record['id']}",
+        )
+        try:
+            # A question whose earlier run died mid-graph picks up from its
+            # last completed node, and one that finished is not run again.
+            snapshot = await graph.aget_state(config) if graph.checkpointer else None
+            if snapshot is not None and is_finished(snapshot):
+                state = snapshot.values
+            else:
+                inputs = new_input(record["question"], snapshot)
+                state = await graph.ainvoke(inputs, config=config)
+            result = final_answer(state["messages"])
+            error = None
+        except Exception as e:
+            result = {"answer": None, "references": []}
+            error = f"{type(e).__name__}: {e}"
+
+        return {
+            "id": record["id"],
+            "question": record["question"],
+            **result,
+            "error": error,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    max_concurrency: int,
+    checkpoint_db: Optional[str] = None,
+):
+    questions = load_questions(input_path)
+    done = load_done_ids(output_path)
+    pending = [q for q in questions if q["id"] not in done]
+    print(
+        f"{len(questions)} questions, {len(questions) - len(pending)} already done, "
+        f"running {len(pending)} with max_concurrency={max_concurrency}"
+    )
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    checkpointer = (
+        async_sqlite_checkpointer(checkpoint_db) if checkpoint_db else nullcontext()
+    )
+
+    async with checkpointer as saver:
+        graph = build_graph(saver) if saver else get_graph()
+        tasks = [asyncio.create_task(run_one(q, semaphore, graph)) for q in pending]
+        failed = await write_results(tasks, output_path)
+
+    print(f"Done: {len(pending) - failed} succeeded, {failed} failed")
+    print(f"Convergence: {convergence_stats()}")
+    print(f"Routing: {route_stats.stats()}")
+
+
+async def write_results(tasks: list, output_path: str) -> int:
+    failed = 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        # Results are written as soon as each run finishes, so an interrupted
+        # sweep keeps everything completed so far.
+        for finished, task in enumerate(asyncio.as_completed(tasks), 1):
+            record = await task
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            failed += bool(record["error"])
+            status = "error" if record["error"] else "ok"
+            print(
+                f"[{finished}/{len(tasks)}] {record['id']} {status} "
+                f"({record['elapsed_s']}s)"
+            )
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run many questions through the Reflexion graph."
+    )
+    parser.add_argument("input", help="JSONL file with 'id' and 'question' fields")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=int(os.getenv("BATCH_MAX_CONCURRENCY", "4")),
+        help="Maximum number of graph runs in flight at once",
+    )
+    parser.add_argument(
+        "--checkpoints",
+        nargs="?",
+        const=CHECKPOINT_DB_PATH,
+        metavar="DB",
+        help="Checkpoint each question in SQLite so a rerun resumes unfinished "
+        "ones mid-graph (default DB: CHECKPOINT_DB_PATH)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        run_batch(args.input, args.output, args.max_concurrency, args.checkpoints)
+    )
+
+
+if __name__ == "__main__":
+    main()
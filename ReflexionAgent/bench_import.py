@@ -0,0 +1,73 @@
+"""Measure how long a fresh worker takes to import and build the Reflexion graph.
+
+Each measurement runs in a new interpreter so module caches do not hide the
+cost. ``import main`` is what a worker pays up front; ``build graph`` is the
+one-off cost paid when the first request actually needs the graph. The
+eager case is what importing main cost before the graph was built lazily:
+the full build plus rendering graph.png (through GRAPH_DIAGRAM_METHOD, by
+default the mermaid.ink API, so it needs network access).
+
+    python bench_import.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "import main": "import main",
+    "import main + build graph": "import main; main.graph",
+    # Written to a scratch directory so the tracked graph.png stays as is.
+    "eager (build + draw PNG)": (
+        "import os, tempfile; import main; graph = main.graph; "
+        "os.chdir(tempfile.mkdtemp()); main.draw_graph(graph, 'png')"
+    ),
+}
+
+TIMER = """
+import time
+started = time.perf_counter()
+{code}
+print(time.perf_counter() - started)
+"""
+
+
+def measure(code: str, runs: int) -> list[float]:
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench")}
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(code=code)],
+            cwd=here,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, code in SNIPPETS.items():
+        try:
+            timings = measure(code, args.runs)
+        except subprocess.CalledProcessError as e:
+            error = (e.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{name:<28} failed: {error}")
+            continue
+        print(
+            f"{name:<28} median {statistics.median(timings) * 1000:8.1f} ms  "
+            f"min {min(timings) * 1000:8.1f} ms  ({args.runs} runs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,11 @@
 import datetime
 import os
+from functools import lru_cache
 
+from agent_common.llm_cache import LLMResponseCache
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from langchain_core.output_parsers.openai_tools import (JsonOutputToolsParser,
-                                                        PydanticToolsParser)
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnableLambda
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
+from routing import LLM_MODEL, Route
 from schemas import AnswerQuestion, ResponderWithRetries, ReviseAnswer
 
 load_dotenv()
@@ -19,27 +17,69 @@ AZURE_ENDPOINT = os.getenv("azure_endpoint")
 API_KEY = os.getenv("api_key")
 API_VERSION = os.getenv("azure_api_version")
 
-llm = ChatOpenAI(
-    base_url=BASE_URL,
-    api_key=AUTH_CODE,
-    model="gpt-oss-120b",
-    extra_body={
-        "reasoning": {
-            "effort": "high",  # "low" | "medium" | "high"
-        }
-    },
-)
+# How precisely the prompt states the current time. The time sits in the
+# prompt suffix, but a coarser value still lets identical questions share
+# LLM cache entries: "day", "hour", "minute" or "second".
+PROMPT_TIME_GRANULARITY = os.getenv("PROMPT_TIME_GRANULARITY", "hour")
+_TIME_FORMATS = {
+    "day": "%Y-%m-%d",
+    "hour": "%Y-%m-%dT%H:00",
+    "minute": "%Y-%m-%dT%H:%M",
+    "second": "%Y-%m-%dT%H:%M:%S",
+}
+
+llm_cache = LLMResponseCache()
+
+
+def current_time() -> str:
+    time_format = _TIME_FORMATS.get(PROMPT_TIME_GRANULARITY, _TIME_FORMATS["second"])
+    return datetime.datetime.now().strftime(time_format)
+
+
+# The LLM client, parsers and responders are built on first use rather than at
+# import time: langchain_openai alone takes about a second to import, which
+# short-lived workers should not pay before they need a model.
+@lru_cache(maxsize=None)
+def get_llm(model: str = LLM_MODEL, effort: str = "high"):
+    from agent_common.http_clients import (get_async_http_client,
+                                           get_http_client)
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        base_url=BASE_URL,
+        api_key=AUTH_CODE,
+        model=model,
+        cache=llm_cache,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        # The shared rate limiter retries; SDK retries would multiply its attempts.
+        max_retries=0,
+        extra_body={
+            "reasoning": {
+                "effort": effort,  # "low" | "medium" | "high"
+            }
+        },
+    )
+
+    # from langchain_openai import AzureChatOpenAI
+    # return AzureChatOpenAI(
+    #     azure_deployment="gpt-4.1",  # Your deployment name
+    #     azure_endpoint=AZURE_ENDPOINT,
+    #     api_key=API_KEY,
+    #     api_version=API_VERSION,
+    # )
+
 
-# llm = AzureChatOpenAI(
-#     azure_deployment="gpt-4.1",  # Your deployment name
-#     azure_endpoint=AZURE_ENDPOINT,
-#     api_key=API_KEY,
-#     api_version=API_VERSION,
-# )
+@lru_cache(maxsize=None)
+def get_parsers():
+    from langchain_core.output_parsers.openai_tools import (
+        JsonOutputToolsParser, PydanticToolsParser)
 
-parser = JsonOutputToolsParser(return_id=True)
-parser_pydantic_answer = PydanticToolsParser(tools=[AnswerQuestion])
-parser_pydantic_revise = PydanticToolsParser(tools=[ReviseAnswer])
+    return {
+        "parser": JsonOutputToolsParser(return_id=True),
+        "parser_pydantic_answer": PydanticToolsParser(tools=[AnswerQuestion]),
+        "parser_pydantic_revise": PydanticToolsParser(tools=[ReviseAnswer]),
+    }
 
 
 def format_draft_output(tool_calls):
@@ -56,34 +96,33 @@ def format_revise_output(tool_calls):
     return {}
 
 
+# Everything that varies per request (conversation, time) comes after the
+# fixed instructions, so providers can serve the prefix from their prompt
+# cache.
 actor_prompt_template = ChatPromptTemplate.from_messages(
     [
         (
             "system",
             """
                 Your are expert researcher.
-                Current time: {time}
                 1. {first_instruction}
                 2. Reflect and critique your answer. Be severe to maximize improvement.
                 3. Recommend search queries to research information and improve your answer. 
             """,
         ),
         MessagesPlaceholder(variable_name="messages"),
-        ("system", "Answer the user's question above using the required format."),
+        (
+            "system",
+            "Answer the user's question above using the required format.\n"
+            "Current time: {time}",
+        ),
     ]
-).partial(time=lambda: datetime.datetime.now().isoformat())
+).partial(time=current_time)
 
 first_responder_prompt_template = actor_prompt_template.partial(
     first_instruction="Provide a detailed ~250 word answer."
 )
 
-initial_answer_chain = first_responder_prompt_template | llm.bind_tools(
-    tools=[AnswerQuestion], tool_choice="AnswerQuestion"
-)
-
-first_responder = ResponderWithRetries(
-    runnable=initial_answer_chain, validator=parser_pydantic_answer
-)
 
 revise_instructions = """
                         Revise your previous answer using the new information.
@@ -99,15 +138,72 @@ revise_instructions = """
 revisor_prompt_template = actor_prompt_template.partial(
     first_instruction=revise_instructions
 )
-revision_chain = revisor_prompt_template | llm.bind_tools(
-    tools=[ReviseAnswer], tool_choice="ReviseAnswer"
-)
-revisor = ResponderWithRetries(
-    runnable=revision_chain, validator=parser_pydantic_revise
-)
+
+
+def initial_answer_chain_for(route: Route):
+    return first_responder_prompt_template | get_llm(
+        route.model, route.effort
+    ).bind_tools(tools=[AnswerQuestion], tool_choice="AnswerQuestion")
+
+
+@lru_cache(maxsize=None)
+def get_first_responder() -> ResponderWithRetries:
+    return ResponderWithRetries(
+        runnable=None,
+        validator=get_parsers()["parser_pydantic_answer"],
+        node="draft",
+        chain_for=initial_answer_chain_for,
+    )
+
+
+def revision_chain_for(route: Route):
+    from compaction import compact_input
+    from langchain_core.runnables import RunnableLambda
+
+    # Only the prompt sent to the model is compacted; the graph state keeps
+    # the full history.
+    return (
+        RunnableLambda(compact_input)
+        | revisor_prompt_template
+        | get_llm(route.model, route.effort).bind_tools(
+            tools=[ReviseAnswer], tool_choice="ReviseAnswer"
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def get_revisor() -> ResponderWithRetries:
+    return ResponderWithRetries(
+        runnable=None,
+        validator=get_parsers()["parser_pydantic_revise"],
+        node="revise",
+        chain_for=revision_chain_for,
+    )
+
+
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "first_responder": get_first_responder,
+    "revisor": get_revisor,
+    "initial_answer_chain": lambda: get_first_responder().runnable,
+    "revision_chain": lambda: get_revisor().runnable,
+    "parser": lambda: get_parsers()["parser"],
+    "parser_pydantic_answer": lambda: get_parsers()["parser_pydantic_answer"],
+    "parser_pydantic_revise": lambda: get_parsers()["parser_pydantic_revise"],
+}
+
+
+def __getattr__(name):
+    # Keeps `from chains import llm, first_responder, ...` working.
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
+    from langchain_core.messages import HumanMessage
+    from langchain_core.runnables import RunnableLambda
+
     print("Hello from reflexionagent!")
 
     human_message = HumanMessage(
@@ -117,8 +213,8 @@ def main():
 
     chain = (
         first_responder_prompt_template
-        | llm.bind_tools(tools=[AnswerQuestion], tool_choice="AnswerQuestion")
-        | parser_pydantic
+        | get_llm().bind_tools(tools=[AnswerQuestion], tool_choice="AnswerQuestion")
+        | get_parsers()["parser_pydantic_answer"]
         | RunnableLambda(format_draft_output)
     )
 
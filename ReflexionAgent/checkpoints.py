@@ -0,0 +1,84 @@
+import os
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHECKPOINT_DB_PATH = os.getenv(
+    "CHECKPOINT_DB_PATH",
+    os.path.expanduser("~/.cache/ai-agents/reflexion_checkpoints.db"),
+)
+
+
+def _prepare(path: str) -> str:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+
+@contextmanager
+def sqlite_checkpointer(path: str = CHECKPOINT_DB_PATH):
+    """SQLite saver for ``graph.invoke``/``graph.stream``; closed on exit."""
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    with SqliteSaver.from_conn_string(_prepare(path)) as saver:
+        yield saver
+
+
+@asynccontextmanager
+async def async_sqlite_checkpointer(path: str = CHECKPOINT_DB_PATH):
+    """Async counterpart of ``sqlite_checkpointer`` for ``ainvoke``/``astream``."""
+
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    async with AsyncSqliteSaver.from_conn_string(_prepare(path)) as saver:
+        yield saver
+
+
+def is_finished(snapshot) -> bool:
+    """Whether the thread saved in ``snapshot`` (``graph.get_state``) ran to the end."""
+
+    return bool(snapshot.values) and not snapshot.next
+
+
+def new_input(question: str, snapshot=None) -> Optional[dict]:
+    """Graph input that asks ``question`` on the thread saved in ``snapshot``.
+
+    A thread holds one question: a new thread starts with it, and one that
+    stopped mid-run resumes from its last completed node (``None``). A
+    finished thread ends with a revision whose tool calls were never
+    answered, so it cannot take more input; callers return its saved state.
+    """
+
+    if snapshot is not None and snapshot.values:
+        if not snapshot.next:
+            raise ValueError("The thread has finished; start a new one.")
+        return None
+    return {"messages": [("user", question)]}
+
+
+def run_config(
+    thread_id: Optional[str] = None,
+    checkpoint_id: Optional[str] = None,
+    max_iterations: Optional[int] = None,
+    **config,
+) -> dict:
+    """Config that runs, resumes or replays ``thread_id`` (if given).
+
+    With ``checkpoint_id`` the graph replays from that checkpoint: the nodes
+    before it are not run again, and settings such as ``max_iterations`` can
+    differ from the original run because they are read from this config, not
+    from the saved state.
+    """
+
+    configurable = {}
+    if thread_id:
+        configurable["thread_id"] = thread_id
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    if max_iterations is not None:
+        configurable["max_iterations"] = max_iterations
+    return {**config, "configurable": configurable}
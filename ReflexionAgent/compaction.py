@@ -0,0 +1,106 @@
+import os
+from typing import List
+
+from dotenv import load_dotenv
+from langchain_core.messages import (AIMessage, BaseMessage, HumanMessage,
+                                     ToolMessage)
+from langchain_core.messages.utils import count_tokens_approximately
+
+load_dotenv()
+
+COMPACTION_TOKEN_BUDGET = int(os.getenv("COMPACTION_TOKEN_BUDGET", "12000"))
+COMPACTION_TOOL_CHARS = int(os.getenv("COMPACTION_TOOL_CHARS", "1200"))
+COMPACTION_ANSWER_CHARS = int(os.getenv("COMPACTION_ANSWER_CHARS", "600"))
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n... [{len(text) - limit} characters omitted]"
+
+
+def _split_rounds(messages: List[BaseMessage]):
+    """Split the history into the leading user turn and the tool-call rounds.
+
+    A round is an AIMessage with tool calls followed by the ToolMessages that
+    answer it. Rounds are kept or dropped as a whole because the API rejects
+    tool calls without their results.
+    """
+
+    head, rounds = [], []
+    for message in messages:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            rounds.append([message])
+        elif rounds:
+            rounds[-1].append(message)
+        else:
+            head.append(message)
+    return head, rounds
+
+
+def _shrink_round(round_: List[BaseMessage], tool_chars: int, answer_chars: int):
+    shrunk = []
+    for message in round_:
+        if isinstance(message, ToolMessage) and isinstance(message.content, str):
+            message = message.model_copy(
+                update={"content": _truncate(message.content, tool_chars)}
+            )
+        elif isinstance(message, AIMessage) and message.tool_calls:
+            # Superseded drafts only need their gist; references are kept.
+            tool_calls = [
+                {
+                    **tool_call,
+                    "args": {
+                        **tool_call["args"],
+                        "answer": _truncate(
+                            str(tool_call["args"].get("answer", "")), answer_chars
+                        ),
+                    },
+                }
+                for tool_call in message.tool_calls
+            ]
+            message = message.model_copy(update={"tool_calls": tool_calls})
+        shrunk.append(message)
+    return shrunk
+
+
+def compact_messages(
+    messages: List[BaseMessage],
+    budget: int = COMPACTION_TOKEN_BUDGET,
+    tool_chars: int = COMPACTION_TOOL_CHARS,
+    answer_chars: int = COMPACTION_ANSWER_CHARS,
+) -> List[BaseMessage]:
+    """Fit the message history into ``budget`` tokens for the next LLM call.
+
+    The user's question and the latest round (current revision plus its fresh
+    search results) are never touched. Older rounds are truncated first and,
+    if that is still not enough, dropped oldest first.
+    """
+
+    if count_tokens_approximately(messages) <= budget:
+        return messages
+
+    head, rounds = _split_rounds(messages)
+    if len(rounds) <= 1:
+        return messages
+
+    latest = rounds[-1]
+    older = [_shrink_round(r, tool_chars, answer_chars) for r in rounds[:-1]]
+
+    def flatten(kept_rounds):
+        return head + [m for r in kept_rounds for m in r] + latest
+
+    while older and count_tokens_approximately(flatten(older)) > budget:
+        older.pop(0)
+
+    if len(older) < len(rounds) - 1:
+        dropped = len(rounds) - 1 - len(older)
+        note = HumanMessage(
+            content=f"[{dropped} earlier research round(s) omitted to save space]"
+        )
+        return head + [note] + [m for r in older for m in r] + latest
+    return flatten(older)
+
+
+def compact_input(inputs: dict) -> dict:
+    return {**inputs, "messages": compact_messages(inputs["messages"])}
@@ -0,0 +1,144 @@
+import difflib
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from evidence import NO_NEW_RESULTS, normalize_url, terms
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+load_dotenv()
+
+CONVERGENCE_EARLY_STOP = os.getenv("CONVERGENCE_EARLY_STOP", "1") == "1"
+# Consecutive answers at least this similar (0-1, word level) count as stable...
+CONVERGENCE_ANSWER_SIMILARITY = float(
+    os.getenv("CONVERGENCE_ANSWER_SIMILARITY", "0.85")
+)
+# ...provided the reference set changed by at most this share (Jaccard distance).
+CONVERGENCE_REFERENCE_CHANGE = float(os.getenv("CONVERGENCE_REFERENCE_CHANGE", "0.2"))
+# A "missing" critique with fewer content words has nothing left to research.
+CONVERGENCE_MIN_CRITIQUE_TERMS = int(os.getenv("CONVERGENCE_MIN_CRITIQUE_TERMS", "6"))
+# A new query this close (term Jaccard) to an earlier one repeats that search.
+CONVERGENCE_QUERY_OVERLAP = float(os.getenv("CONVERGENCE_QUERY_OVERLAP", "0.6"))
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def answer_similarity(previous: str, current: str) -> float:
+    return difflib.SequenceMatcher(
+        None, previous.lower().split(), current.lower().split(), autojunk=False
+    ).ratio()
+
+
+def reference_change(previous: List[str], current: List[str]) -> float:
+    """Jaccard distance between two reference lists; 0 means the same pages."""
+
+    before = {normalize_url(url) for url in previous}
+    after = {normalize_url(url) for url in current}
+    if not before and not after:
+        return 0.0
+    return 1 - len(before & after) / len(before | after)
+
+
+def query_overlap(query: str, earlier: List[str]) -> float:
+    """Highest term overlap between ``query`` and any earlier query."""
+
+    query_terms = set(terms(query))
+    best = 0.0
+    for other in earlier:
+        other_terms = set(terms(other))
+        if query_terms | other_terms:
+            best = max(
+                best,
+                len(query_terms & other_terms) / len(query_terms | other_terms),
+            )
+    return best
+
+
+def _answers(messages: List[BaseMessage]) -> List[dict]:
+    """Tool-call arguments of every draft and revision, oldest first."""
+
+    return [
+        message.tool_calls[0]["args"]
+        for message in messages
+        if isinstance(message, AIMessage) and message.tool_calls
+    ]
+
+
+def _no_new_evidence(messages: List[BaseMessage]) -> bool:
+    """Whether the latest search round added nothing the model had not seen."""
+
+    tool_message = next(
+        (m for m in reversed(messages) if isinstance(m, ToolMessage)), None
+    )
+    if tool_message is None or not isinstance(tool_message.content, str):
+        return False
+    sections = [
+        s for s in tool_message.content.split("\n\n") if s.startswith("Query: ")
+    ]
+    return bool(sections) and all(s.endswith(NO_NEW_RESULTS) for s in sections)
+
+
+def convergence_reason(messages: List[BaseMessage]) -> Optional[str]:
+    """Why another search-and-revise round would not pay off, or None.
+
+    Looks at the latest revision against the answer before it: an answer
+    that barely changed with the same references is stable, a critique with
+    nothing missing or a last search that found nothing new leaves nothing to
+    research, and queries that repeat earlier ones would fetch the same pages.
+    """
+
+    answers = _answers(messages)
+    if len(answers) < 2:
+        return None
+    previous, current = answers[-2], answers[-1]
+
+    similarity = answer_similarity(
+        str(previous.get("answer", "")), str(current.get("answer", ""))
+    )
+    # The draft carries no references, so only revisions are compared on them.
+    references_kept = "references" not in previous or (
+        reference_change(previous["references"] or [], current.get("references") or [])
+        <= CONVERGENCE_REFERENCE_CHANGE
+    )
+    if similarity >= CONVERGENCE_ANSWER_SIMILARITY and references_kept:
+        return "stable_answer"
+
+    missing = (current.get("reflection") or {}).get("missing", "")
+    if len(terms(str(missing))) < CONVERGENCE_MIN_CRITIQUE_TERMS:
+        return "empty_critique"
+
+    if _no_new_evidence(messages):
+        return "no_new_evidence"
+
+    earlier = [q for args in answers[:-1] for q in args.get("search_queries") or []]
+    queries = current.get("search_queries") or []
+    if queries and all(
+        query_overlap(q, earlier) >= CONVERGENCE_QUERY_OVERLAP for q in queries
+    ):
+        return "redundant_queries"
+    return None
+
+
+def should_stop(messages: List[BaseMessage]) -> Optional[str]:
+    """Check for convergence after a revision and count the outcome."""
+
+    if not CONVERGENCE_EARLY_STOP:
+        return None
+    reason = convergence_reason(messages)
+    with _lock:
+        _stats["checks"] += 1
+        if reason:
+            _stats["early_stops"] += 1
+            _stats[reason] += 1
+    return reason
+
+
+def convergence_stats() -> Dict[str, float]:
+    with _lock:
+        stats = {"checks": 0, "early_stops": 0, **_stats}
+    checks = stats["checks"]
+    stats["early_stop_rate"] = stats["early_stops"] / checks if checks else 0.0
+    return stats
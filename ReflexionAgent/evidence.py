@@ -0,0 +1,184 @@
+import hashlib
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EVIDENCE_CHAR_BUDGET = int(os.getenv("EVIDENCE_CHAR_BUDGET", "4000"))
+NO_NEW_RESULTS = "No new results beyond earlier evidence."
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were what when where which who why will with about how".split()
+)
+# Query parameters that only say how a visitor arrived, matched by exact name
+# (plus the utm_ family) so that e.g. "reference" or "sourceid" survive.
+_TRACKING_PARAMS = frozenset({"fbclid", "gclid", "ref", "source"})
+# Marker compaction.py leaves after a truncated tool output.
+_OMITTED = re.compile(r"^\.\.\. \[\d+ characters omitted\]$")
+
+
+def terms(text: str) -> List[str]:
+    """Lowercase content words of ``text``, stopwords removed."""
+
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _is_tracking(key: str) -> bool:
+    key = key.lower()
+    return key.startswith("utm_") or key in _TRACKING_PARAMS
+
+
+def normalize_url(url: str) -> str:
+    """Reduce a URL to what identifies the page (no scheme, www, tracking)."""
+
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not _is_tracking(k)]
+    path = parts.path.rstrip("/")
+    return f"{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def content_hash(text: str) -> str:
+    # Hashing the word sequence ignores punctuation, case and spacing, which
+    # is how the same snippet usually differs between result pages.
+    return hashlib.sha1(" ".join(_WORD.findall(text.lower())).encode()).hexdigest()
+
+
+@dataclass
+class Evidence:
+    query: str
+    snippet: str
+    link: str
+    title: str
+    score: float = 0.0
+
+    def format(self) -> str:
+        return f"Content: {self.snippet}\nSource: {self.link}\nTitle: {self.title}"
+
+
+class EvidenceStore:
+    """URLs and snippets a run has already put in front of the model."""
+
+    def __init__(self):
+        self.urls = set()
+        self.hashes = set()
+
+    @classmethod
+    def from_messages(cls, messages: Iterable) -> "EvidenceStore":
+        """Rebuild the store from the tool outputs in ``messages``.
+
+        Pass the history as the model sees it (compacted), so evidence that
+        was truncated or dropped from view counts as new again.
+        """
+
+        store = cls()
+        for message in messages:
+            if getattr(message, "type", None) != "tool":
+                continue
+            content = message.content if isinstance(message.content, str) else ""
+            lines = content.splitlines()
+            if lines and _OMITTED.match(lines[-1]):
+                # The line before the marker was cut mid-way.
+                lines = lines[:-2]
+            for line in lines:
+                if line.startswith("Source: "):
+                    store.urls.add(normalize_url(line[len("Source: ") :]))
+                elif line.startswith("Content: "):
+                    store.hashes.add(content_hash(line[len("Content: ") :]))
+        return store
+
+    def add(self, items: Iterable[Evidence]) -> List[Evidence]:
+        """Record ``items`` and return only the ones not seen before."""
+
+        new = []
+        for item in items:
+            url, digest = normalize_url(item.link), content_hash(item.snippet)
+            if url in self.urls or digest in self.hashes:
+                continue
+            self.urls.add(url)
+            self.hashes.add(digest)
+            new.append(item)
+        return new
+
+
+def rank(question: str, items: List[Evidence]) -> List[Evidence]:
+    """Score items by weighted term overlap with the question and their query."""
+
+    question_terms = set(terms(question))
+    documents = [set(terms(f"{item.title} {item.snippet}")) for item in items]
+    # Terms that appear in every result say little about relevance.
+    idf = {
+        term: math.log(1 + len(items) / (1 + sum(term in d for d in documents)))
+        for term in question_terms
+    }
+    for item, document in zip(items, documents):
+        wanted = question_terms | set(terms(item.query))
+        overlap = sum(idf.get(term, 0.5) for term in wanted & document)
+        item.score = overlap / math.sqrt(len(document) or 1)
+    return sorted(items, key=lambda item: item.score, reverse=True)
+
+
+def pack(items: List[Evidence], budget: int = EVIDENCE_CHAR_BUDGET) -> List[Evidence]:
+    """Keep the best ranked items whose formatted text fits in ``budget``."""
+
+    packed, used = [], 0
+    for item in items:
+        size = len(item.format())
+        if used + size > budget:
+            continue
+        packed.append(item)
+        used += size
+    return packed
+
+
+def build_report(
+    question: str,
+    search_queries: List[str],
+    results: List[Union[List[Dict[str, str]], str]],
+    store: Optional[EvidenceStore] = None,
+    budget: int = EVIDENCE_CHAR_BUDGET,
+) -> str:
+    """Format only new, relevant evidence, grouped by query in query order.
+
+    ``results`` holds the raw search results for each query, or an error
+    message string when that search failed.
+    """
+
+    store = store or EvidenceStore()
+    candidates = [
+        Evidence(
+            query=query,
+            snippet=res.get("snippet", ""),
+            link=res.get("link", ""),
+            title=res.get("title", ""),
+        )
+        for query, query_results in zip(search_queries, results)
+        if not isinstance(query_results, str)
+        for res in query_results
+        if res.get("link")
+    ]
+    kept = {id(item) for item in pack(rank(question, store.add(candidates)), budget)}
+
+    sections = []
+    for query, query_results in zip(search_queries, results):
+        if isinstance(query_results, str):
+            sections.append(query_results)
+            continue
+        entries = [
+            item.format()
+            for item in candidates
+            if item.query == query and id(item) in kept
+        ]
+        if entries:
+            sections.append(f"Query: {query}\n" + "\n---\n".join(entries))
+        else:
+            sections.append(f"Query: {query}\n{NO_NEW_RESULTS}")
+    return "\n\n".join(sections)
@@ -1,57 +1,96 @@
-from typing import Annotated, List, Optional, TypedDict
+import argparse
+import os
+from contextlib import nullcontext
+from typing import Optional
 
-from chains import first_responder, revisor
-from langchain_core.messages import (AIMessage, BaseMessage, HumanMessage,
-                                     ToolMessage)
-from langgraph.graph import END, StateGraph
-from langgraph.graph.message import add_messages
-from schemas import AnswerQuestion, ReviseAnswer
-from tool_executor import execute_tools
+from dotenv import load_dotenv
 
-MAX_ITERATIONS = 2
+load_dotenv()
 
+# Importing this module is kept free of side effects: the graph, LLM clients and
+# search tools are only built when main() runs or `main.graph` is accessed, and
+# the diagram is only written on request ("mermaid" renders offline to text,
+# "png" goes through GRAPH_DIAGRAM_METHOD, by default the mermaid.ink API).
+GRAPH_DIAGRAM = os.getenv("GRAPH_DIAGRAM", "").lower()
+GRAPH_DIAGRAM_METHOD = os.getenv("GRAPH_DIAGRAM_METHOD", "api").lower()
 
-class State(TypedDict, total=False):
-    messages: Annotated[List[BaseMessage], add_messages]
-    draft: Optional[AnswerQuestion]
-    revision: Optional[ReviseAnswer]
 
+def __getattr__(name):
+    if name == "graph":
+        from reflexion_graph import get_graph
 
-builder = StateGraph(State)
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-builder.add_node("draft", first_responder.respond)
-builder.add_node("execute_tools", execute_tools)
-builder.add_node("revise", revisor.respond)
 
-builder.add_edge("draft", "execute_tools")
-builder.add_edge("execute_tools", "revise")
+def draw_graph(graph, kind: str = GRAPH_DIAGRAM) -> None:
+    drawable = graph.get_graph()
+    if kind == "mermaid":
+        with open("graph.mmd", "w", encoding="utf-8") as f:
+            f.write(drawable.draw_mermaid())
+    elif kind == "png":
+        from langchain_core.runnables.graph import MermaidDrawMethod
 
+        drawable.draw_mermaid_png(
+            output_file_path="graph.png",
+            draw_method=MermaidDrawMethod(GRAPH_DIAGRAM_METHOD),
+        )
 
-def event_loop(state: List[BaseMessage]) -> str:
-    messages = state.get("messages", [])
-    count_tool_visits = sum(isinstance(item, ToolMessage) for item in messages)
-    num_iterations = count_tool_visits
-    last_message = messages[-1]
 
-    # 1. CRITICAL FIX: Only go to 'execute_tools' if the agent actually ASKED for a tool
-    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
-        print("No need to tool call!")
-        return END
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Reflexion agent.")
+    parser.add_argument(
+        "--thread-id",
+        help="Checkpoint the run under this thread ID (SQLite, CHECKPOINT_DB_PATH)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue --thread-id from its last completed node",
+    )
+    parser.add_argument(
+        "--checkpoint-id", help="Replay --thread-id from this checkpoint"
+    )
+    parser.add_argument(
+        "--max-iterations", type=int, help="Override the revise loop limit"
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="List the checkpoints of --thread-id and exit",
+    )
+    parser.add_argument(
+        "--stream-tokens",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Print the revised answer as it is generated "
+        "(default: REFLEXION_STREAM_TOKENS)",
+    )
+    args = parser.parse_args(argv)
+    if (args.resume or args.checkpoint_id or args.history) and not args.thread_id:
+        parser.error("--resume, --checkpoint-id and --history need --thread-id")
+    return args
 
-    if num_iterations > MAX_ITERATIONS:
-        print("Max iterations exceed!")
-        return END
-    return "execute_tools"
 
+def print_history(graph, config: dict) -> None:
+    for snapshot in graph.get_state_history(config):
+        print(
+            f"{snapshot.config['configurable']['checkpoint_id']}  "
+            f"{snapshot.created_at}  iterations={snapshot.values.get('iterations', 0)}  "
+            f"next={','.join(snapshot.next) or '-'}"
+        )
 
-builder.add_conditional_edges("revise", event_loop, ["execute_tools", END])
-builder.set_entry_point("draft")
-graph = builder.compile()
 
-graph.get_graph().draw_mermaid_png(output_file_path="graph.png")
+def run_graph(
+    graph, config: dict, resume: bool = False, stream_tokens: Optional[bool] = None
+) -> None:
+    from checkpoints import is_finished, new_input
+    from streaming import (REFLEXION_STREAM_TOKENS, ConsoleRenderer,
+                           stream_deltas)
 
+    if GRAPH_DIAGRAM:
+        draw_graph(graph)
 
-def main():
     # prompt = (
     #     "Write about Agentic AI domain, "
     #     "List most popular latest articles."
@@ -60,33 +99,60 @@ def main():
     # out_state = graph.invoke({"messages": [HumanMessage(content=prompt)]})
     # final_messages = out_state["messages"]
 
-    events = graph.stream(
-        {
-            "messages": [
-                (
-                    "user",
-                    "Write about latest updates about aviation sector?, Compare aviation companies?, mention the financial statements of the aviation companies?",
-                )
-            ]
-        },
-        stream_mode="values",
-    )
-    for i, step in enumerate(events):
-        print(f"Step {i}")
-        step["messages"][-1].pretty_print()
-
-        # safest generic output:
-    # events = graph.stream(
-    # {"messages": [("user", "Write about AI-Powered SOC / autonomous soc problem domain...")]},
-    # stream_mode="updates",  # Change to "updates"
-    # )
-
-    # for i, step in enumerate(events):
-    #     for node_name, update in step.items():
-    #         print(f"Step {i} - Currently in node: {node_name}")
-    #         # If you need the full state, you might need to merge 'update' or track it manually,
-    #         # or use stream_mode="debug" for more complex inspection.
-    #         print(update)
+    # A resumed or replayed thread continues from its checkpoint, so it gets
+    # no new input.
+    inputs = None
+    if not resume:
+        snapshot = graph.get_state(config) if graph.checkpointer else None
+        if snapshot is not None and is_finished(snapshot):
+            print("Thread already finished; its saved answer:")
+            snapshot.values["messages"][-1].pretty_print()
+            return
+        inputs = new_input(
+            "Write about latest updates about aviation sector?, Compare aviation companies?, mention the financial statements of the aviation companies?",
+            snapshot,
+        )
+
+    if stream_tokens is None:
+        stream_tokens = REFLEXION_STREAM_TOKENS
+
+    # Per-node updates carry only the new messages, so printing a step costs
+    # the same however long the conversation has grown.
+    renderer = ConsoleRenderer()
+    for delta in stream_deltas(graph, inputs, config, stream_tokens=stream_tokens):
+        renderer.render(delta)
+
+
+def main(argv=None):
+    from agent_common.http_clients import pool_stats, rate_limit_stats
+    from chains import get_first_responder, get_revisor, llm_cache
+    from checkpoints import run_config, sqlite_checkpointer
+    from convergence import convergence_stats
+    from reflexion_graph import build_graph, get_graph
+    from routing import route_stats
+
+    args = parse_args(argv)
+    config = run_config(args.thread_id, args.checkpoint_id, args.max_iterations)
+
+    with sqlite_checkpointer() if args.thread_id else nullcontext() as saver:
+        graph = build_graph(saver) if saver else get_graph()
+        if args.history:
+            print_history(graph, config)
+            return
+        run_graph(
+            graph,
+            config,
+            resume=args.resume or bool(args.checkpoint_id),
+            stream_tokens=args.stream_tokens,
+        )
+
+    print(f"LLM cache: {llm_cache.stats()}")
+    print(f"HTTP pool: {pool_stats()}")
+    print(f"Rate limiter: {rate_limit_stats()}")
+    print(f"Draft validation: {get_first_responder().stats}")
+    print(f"Revise validation: {get_revisor().stats}")
+    print(f"Convergence: {convergence_stats()}")
+    print(f"Routing: {route_stats.stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+from functools import lru_cache
+from typing import Annotated, List, Optional, TypedDict
+
+from chains import get_first_responder, get_revisor
+from convergence import should_stop
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from schemas import AnswerQuestion, ReviseAnswer
+from tool_executor import get_execute_tools
+
+MAX_ITERATIONS = 2
+
+
+class State(TypedDict, total=False):
+    messages: Annotated[List[BaseMessage], add_messages]
+    draft: Optional[AnswerQuestion]
+    revision: Optional[ReviseAnswer]
+    iterations: int
+
+
+def event_loop(state: State, config: Optional[RunnableConfig] = None) -> str:
+    messages = state.get("messages", [])
+    num_iterations = state.get("iterations", 0)
+    # Read per run so a resumed or replayed thread can use a different limit.
+    max_iterations = (
+        (config or {}).get("configurable", {}).get("max_iterations", MAX_ITERATIONS)
+    )
+    last_message = messages[-1]
+
+    # 1. CRITICAL FIX: Only go to 'execute_tools' if the agent actually ASKED for a tool
+    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+        print("No need to tool call!")
+        return END
+
+    if num_iterations > max_iterations:
+        print("Max iterations exceed!")
+        return END
+
+    reason = should_stop(messages)
+    if reason:
+        print(f"Converged early ({reason})!")
+        return END
+    return "execute_tools"
+
+
+def counting_iterations(responder) -> RunnableLambda:
+    """Wrap the revise step so each pass bumps ``iterations`` in the state."""
+
+    def respond(state: State):
+        return {
+            **responder.respond(state),
+            "iterations": state.get("iterations", 0) + 1,
+        }
+
+    async def arespond(state: State):
+        result = await responder.arespond(state)
+        return {**result, "iterations": state.get("iterations", 0) + 1}
+
+    return RunnableLambda(respond, afunc=arespond)
+
+
+def build_graph(checkpointer=None):
+    first_responder = get_first_responder()
+    revisor = get_revisor()
+
+    builder = StateGraph(State)
+
+    builder.add_node(
+        "draft",
+        RunnableLambda(first_responder.respond, afunc=first_responder.arespond),
+    )
+    builder.add_node("execute_tools", get_execute_tools())
+    builder.add_node("revise", counting_iterations(revisor))
+
+    builder.add_edge("draft", "execute_tools")
+    builder.add_edge("execute_tools", "revise")
+
+    builder.add_conditional_edges("revise", event_loop, ["execute_tools", END])
+    builder.set_entry_point("draft")
+    return builder.compile(checkpointer=checkpointer)
+
+
+@lru_cache(maxsize=None)
+def get_graph():
+    return build_graph()
@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from evidence import terms
+
+load_dotenv()
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-oss-120b")
+# Effort a route moves to when its low-effort answer is not good enough.
+ROUTE_ESCALATION_EFFORT = os.getenv("ROUTE_ESCALATION_EFFORT", "high")
+# A draft whose "missing" critique has fewer content words than this is too
+# shallow to drive a revision, so the call is repeated at the escalation effort.
+ROUTE_WEAK_CRITIQUE_TERMS = int(os.getenv("ROUTE_WEAK_CRITIQUE_TERMS", "3"))
+
+_DEFAULT_EFFORTS = {"draft": "low", "revise": "low", "retry": "high"}
+
+
+@dataclass(frozen=True)
+class Route:
+    node: str
+    model: str
+    effort: str  # "low" | "medium" | "high"
+
+    @property
+    def key(self) -> str:
+        return f"{self.node}/{self.model}/{self.effort}"
+
+
+def route_for(node: str) -> Route:
+    """Model and reasoning effort for ``node`` (draft, revise or retry).
+
+    Configured with ROUTE_<NODE>_MODEL and ROUTE_<NODE>_EFFORT.
+    """
+
+    prefix = f"ROUTE_{node.upper()}"
+    return Route(
+        node=node,
+        model=os.getenv(f"{prefix}_MODEL", LLM_MODEL),
+        effort=os.getenv(f"{prefix}_EFFORT", _DEFAULT_EFFORTS.get(node, "high")),
+    )
+
+
+def escalate(route: Route) -> Optional[Route]:
+    """The same route at the escalation effort, or None if already there."""
+
+    if route.effort == ROUTE_ESCALATION_EFFORT:
+        return None
+    return replace(route, effort=ROUTE_ESCALATION_EFFORT)
+
+
+def weak_critique(response) -> bool:
+    tool_calls = getattr(response, "tool_calls", None) or []
+    if not tool_calls:
+        return False
+    reflection = tool_calls[0]["args"].get("reflection") or {}
+    missing = reflection.get("missing", "") if isinstance(reflection, dict) else ""
+    return len(terms(str(missing))) < ROUTE_WEAK_CRITIQUE_TERMS
+
+
+class RouteStats:
+    """Latency and token totals per route, shared by every responder."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(
+            lambda: {
+                "calls": 0,
+                "seconds": 0.0,
+                "input_tokens": 0,
+                "cached_tokens": 0,
+                "output_tokens": 0,
+            }
+        )
+        self._escalations = defaultdict(int)
+
+    def record(self, route: Route, seconds: float, response) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        with self._lock:
+            totals = self._routes[route]
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["input_tokens"] += usage.get("input_tokens", 0)
+            # Prompt tokens the provider served from its prefix cache.
+            totals["cached_tokens"] += (usage.get("input_token_details") or {}).get(
+                "cache_read", 0
+            )
+            totals["output_tokens"] += usage.get("output_tokens", 0)
+
+    def escalated(self, reason: str) -> None:
+        with self._lock:
+            self._escalations[reason] += 1
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-route averages, plus what each cheaper route saved.
+
+        Savings compare a route's average call with the same node and model
+        at the escalation effort, so they only appear once both were seen.
+        """
+
+        with self._lock:
+            routes = {route: dict(totals) for route, totals in self._routes.items()}
+            escalations = dict(self._escalations)
+
+        def average(totals: dict, name: str) -> float:
+            return totals[name] / totals["calls"]
+
+        report = {}
+        for route, totals in routes.items():
+            entry = {
+                "calls": totals["calls"],
+                "avg_s": round(average(totals, "seconds"), 3),
+                "avg_input_tokens": round(average(totals, "input_tokens"), 1),
+                "cached_input_share": round(
+                    totals["cached_tokens"] / (totals["input_tokens"] or 1), 3
+                ),
+                "avg_output_tokens": round(average(totals, "output_tokens"), 1),
+            }
+            reference = routes.get(escalate(route)) if escalate(route) else None
+            if reference:
+                entry["saved_s"] = round(
+                    (average(reference, "seconds") - average(totals, "seconds"))
+                    * totals["calls"],
+                    3,
+                )
+                entry["saved_output_tokens"] = round(
+                    (
+                        average(reference, "output_tokens")
+                        - average(totals, "output_tokens")
+                    )
+                    * totals["calls"]
+                )
+            report[route.key] = entry
+        return {"routes": report, "escalations": escalations}
+
+
+route_stats = RouteStats()
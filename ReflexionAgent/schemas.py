@@ -1,8 +1,10 @@
-from typing import Annotated, List, Optional, TypedDict
+import json
+import time
+from functools import cached_property
+from typing import Callable, List, Optional
 
-from langchain_core.messages import BaseMessage, ToolMessage
-from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field, ValidationError
+from routing import Route, escalate, route_for, route_stats, weak_critique
 
 
 class Reflection(BaseModel):
@@ -28,28 +30,222 @@ class ReviseAnswer(AnswerQuestion):
     )
 
 
+def _loads(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _as_str_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        # Most often the list arrives JSON-encoded as a string.
+        parsed = _loads(value)
+        if isinstance(parsed, list):
+            return _as_str_list(parsed)
+        # Otherwise a newline or bullet separated string.
+        items = (line.strip().lstrip("-*\u2022").strip() for line in value.splitlines())
+        return [item for item in items if item]
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item is not None]
+    return [str(value)]
+
+
+def repair_tool_args(args: dict, schema: type[BaseModel]) -> dict:
+    """Fix the schema violations the models commonly make, without an LLM call."""
+
+    args = dict(args)
+    fields = schema.model_fields
+
+    # Missing fields are real failures and are left for the LLM retry: filling
+    # them in would pass e.g. an empty critique off as a converged answer.
+    for name in ("search_queries", "references"):
+        value = args.get(name)
+        if name in fields and value is not None and not isinstance(value, list):
+            args[name] = _as_str_list(value)
+
+    reflection = args.get("reflection")
+    if "reflection" in fields and isinstance(reflection, str):
+        parsed = _loads(reflection)
+        reflection = (
+            parsed
+            if isinstance(parsed, dict)
+            else {"missing": reflection, "superfluous": ""}
+        )
+    if "reflection" in fields and isinstance(reflection, dict):
+        args["reflection"] = {
+            key: value if isinstance(value, str) else json.dumps(value)
+            for key, value in reflection.items()
+            if value is not None
+        }
+
+    answer = args.get("answer")
+    if "answer" in fields and answer is not None and not isinstance(answer, str):
+        args["answer"] = json.dumps(answer) if isinstance(answer, dict) else str(answer)
+
+    return args
+
+
 class ResponderWithRetries:
-    def __init__(self, runnable, validator):
+    """Call the model until its tool call validates against ``validator``.
+
+    With a ``node`` and a ``chain_for`` factory, each attempt is routed: the
+    first goes to the node's own route, a retry after a validation error to
+    the "retry" route, and a valid draft with a weak critique is asked again
+    once at the escalation effort.
+    """
+
+    def __init__(
+        self,
+        runnable,
+        validator,
+        node: Optional[str] = None,
+        chain_for: Optional[Callable[[Route], object]] = None,
+    ):
+        self.node = node
+        self.chain_for = chain_for
+        self._chains = {}
+        if chain_for and node:
+            runnable = self._chain(route_for(node))
         self.runnable = runnable
         self.validator = validator
+        self.stats = {"responses": 0, "repaired": 0, "llm_retries": 0}
+
+    @cached_property
+    def schema_text(self) -> str:
+        return json.dumps([tool.model_json_schema() for tool in self.validator.tools])
 
     def respond(self, state: dict):
-        response = []
+        response, valid = [], None
+        route = self._first_route()
+        for attempt in range(3):
+            started = time.perf_counter()
+            response = self._chain(route).invoke(
+                {"messages": state["messages"]}, self._run_config(attempt, route)
+            )
+            self._record(route, started, response)
+            try:
+                valid = self._validate(response)
+            except ValidationError as e:
+                state["messages"] = state["messages"] + self._retry_messages(
+                    response, e
+                )
+                route = self._retry_route(route)
+                continue
+            route = self._escalated_route(route, valid)
+            if route is None:
+                break
+        return {"messages": valid if valid is not None else response}
+
+    async def arespond(self, state: dict):
+        response, valid = [], None
+        route = self._first_route()
         for attempt in range(3):
-            response = self.runnable.invoke(
-                {"messages": state["messages"]}, {"tags": [f"attempt:{attempt}"]}
+            started = time.perf_counter()
+            response = await self._chain(route).ainvoke(
+                {"messages": state["messages"]}, self._run_config(attempt, route)
             )
+            self._record(route, started, response)
             try:
-                self.validator.invoke(response)
-                return {"messages": response}
+                valid = self._validate(response)
             except ValidationError as e:
-                state["messages"] = state["messages"] + [
-                    response,
-                    ToolMessage(
-                        content=f"{repr(e)}\n\nPay close attention to the function schema.\n\n"
-                        + self.validator.schema_json()
-                        + " Respond by fixing all validation errors.",
-                        tool_call_id=response.tool_calls[0]["id"],
-                    ),
-                ]
-        return {"messages": response}
+                state["messages"] = state["messages"] + self._retry_messages(
+                    response, e
+                )
+                route = self._retry_route(route)
+                continue
+            route = self._escalated_route(route, valid)
+            if route is None:
+                break
+        return {"messages": valid if valid is not None else response}
+
+    @property
+    def routed(self) -> bool:
+        return bool(self.chain_for and self.node)
+
+    def _chain(self, route: Optional[Route]):
+        if route is None:
+            return self.runnable
+        if route not in self._chains:
+            self._chains[route] = self.chain_for(route)
+        return self._chains[route]
+
+    def _first_route(self) -> Optional[Route]:
+        return route_for(self.node) if self.routed else None
+
+    def _retry_route(self, route: Optional[Route]) -> Optional[Route]:
+        if not self.routed:
+            return None
+        route_stats.escalated("validation_error")
+        return route_for("retry")
+
+    def _escalated_route(self, route: Optional[Route], response) -> Optional[Route]:
+        """Route for one more try at a valid answer, or None to keep it."""
+
+        # A revision with a short critique is where convergence stops the
+        # loop (empty_critique), so only the draft is worth a second call.
+        if route is None or route.node != "draft" or not weak_critique(response):
+            return None
+        better = escalate(route)
+        if better is not None:
+            route_stats.escalated("weak_critique")
+        return better
+
+    @staticmethod
+    def _run_config(attempt: int, route: Optional[Route]) -> dict:
+        tags = [f"attempt:{attempt}"]
+        if route is not None:
+            tags.append(f"route:{route.key}")
+        return {"tags": tags}
+
+    @staticmethod
+    def _record(route: Optional[Route], started: float, response) -> None:
+        if route is not None:
+            route_stats.record(route, time.perf_counter() - started, response)
+
+    def _validate(self, response):
+        self.stats["responses"] += 1
+        try:
+            self.validator.invoke(response)
+            return response
+        except ValidationError:
+            repaired = self._repair(response)
+            if repaired is None:
+                raise
+
+        # Raises the repaired response's error if the repair was not enough,
+        # which then goes back to the model as usual.
+        self.validator.invoke(repaired)
+        self.stats["repaired"] += 1
+        return repaired
+
+    def _repair(self, response):
+        schemas = {tool.__name__: tool for tool in self.validator.tools}
+        tool_calls = []
+        for tool_call in getattr(response, "tool_calls", None) or []:
+            schema = schemas.get(tool_call["name"])
+            if schema is not None:
+                tool_call = {
+                    **tool_call,
+                    "args": repair_tool_args(tool_call["args"], schema),
+                }
+            tool_calls.append(tool_call)
+        if not tool_calls or tool_calls == response.tool_calls:
+            return None
+        return response.model_copy(update={"tool_calls": tool_calls})
+
+    def _retry_messages(self, response, error: ValidationError):
+        from langchain_core.messages import ToolMessage
+
+        self.stats["llm_retries"] += 1
+        return [
+            response,
+            ToolMessage(
+                content=f"{repr(error)}\n\nPay close attention to the function schema.\n\n"
+                + self.schema_text
+                + " Respond by fixing all validation errors.",
+                tool_call_id=response.tool_calls[0]["id"],
+            ),
+        ]
@@ -0,0 +1,65 @@
+"""HTTP service for the Reflexion agent.
+
+Streaming runs get one ``step`` event per finished graph node (draft,
+execute_tools, revise) with the messages it added. With
+REFLEXION_STREAM_TOKENS=1 the revised answer also arrives as ``token``
+events while it is generated (``token_start`` marks a new attempt).
+
+    python server.py
+    curl -N localhost:8000/runs -d '{"input": "...", "stream": true}'
+"""
+
+from agent_common.agent_service import (AgentService, Emit, create_app,
+                                        serialize_message, serve)
+from agent_common.http_clients import pool_stats, rate_limit_stats
+from batch import final_answer
+from convergence import convergence_stats
+from reflexion_graph import get_graph
+from routing import route_stats
+from streaming import astream_deltas
+
+
+def warm():
+    import tool_executor
+
+    get_graph()
+    tool_executor.get_wrapper()
+
+
+async def run(input: str, emit: Emit) -> dict:
+    # Only the latest answer is kept, not the whole state after every step.
+    latest = []
+    async for delta in astream_deltas(get_graph(), {"messages": [("user", input)]}):
+        if delta.kind == "token":
+            await emit("token", {"node": delta.node, "text": delta.text})
+        elif delta.kind == "token_start":
+            await emit("token_start", {"node": delta.node})
+        else:
+            if any(getattr(m, "tool_calls", None) for m in delta.messages):
+                latest = delta.messages
+            await emit(
+                "step",
+                {
+                    "node": delta.node,
+                    "messages": [serialize_message(m) for m in delta.messages],
+                },
+            )
+    return final_answer(latest)
+
+
+service = AgentService(run)
+app = create_app(
+    service,
+    "Reflexion Agent",
+    warm=warm,
+    stats=lambda: {
+        "convergence": convergence_stats(),
+        "routing": route_stats.stats(),
+        "http_pool": pool_stats(),
+        "rate_limiter": rate_limit_stats(),
+    },
+)
+
+
+if __name__ == "__main__":
+    serve(app)
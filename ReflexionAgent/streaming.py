@@ -0,0 +1,169 @@
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.utils.json import parse_partial_json
+
+load_dotenv()
+
+# Stream the revised answer token by token instead of once revise finishes.
+REFLEXION_STREAM_TOKENS = os.getenv("REFLEXION_STREAM_TOKENS", "0") == "1"
+# Tool-call argument whose text is streamed for structured-output nodes.
+STREAM_FIELD = "answer"
+
+
+@dataclass
+class Delta:
+    """One piece of new output from a graph run.
+
+    ``update``: a node finished and added ``messages``.
+    ``token_start``: a model call inside ``node`` started streaming (a retry
+    starts a new one, so consumers should drop partial text they hold).
+    ``token``: new answer ``text`` from that call.
+    """
+
+    kind: str
+    node: str
+    messages: List[BaseMessage] = field(default_factory=list)
+    text: str = ""
+
+
+class _DeltaBuilder:
+    """Turns graph stream chunks into deltas carrying only new content."""
+
+    def __init__(self, token_nodes: Iterable[str]):
+        self.token_nodes = set(token_nodes)
+        # Per streamed message id: accumulated tool-call args, text sent so far.
+        self._args: Dict[str, str] = {}
+        self._sent: Dict[str, str] = {}
+
+    def feed(self, mode: str, chunk) -> List[Delta]:
+        if mode == "updates":
+            return self._updates(chunk)
+        if mode == "messages":
+            return self._tokens(*chunk)
+        return []
+
+    def _updates(self, chunk: dict) -> List[Delta]:
+        deltas = []
+        for node, update in chunk.items():
+            messages = (update or {}).get("messages", [])
+            if not isinstance(messages, list):
+                messages = [messages]
+            deltas.append(Delta("update", node, messages=messages))
+        self._args.clear()
+        self._sent.clear()
+        return deltas
+
+    def _tokens(self, message, metadata: dict) -> List[Delta]:
+        node = metadata.get("langgraph_node")
+        if node not in self.token_nodes or not isinstance(message, AIMessageChunk):
+            return []
+
+        deltas = []
+        if message.id not in self._sent:
+            self._args[message.id] = ""
+            self._sent[message.id] = ""
+            deltas.append(Delta("token_start", node))
+
+        if message.tool_call_chunks:
+            self._args[message.id] += "".join(
+                c.get("args") or "" for c in message.tool_call_chunks
+            )
+            # Re-parsing the partial JSON is quadratic in the argument size,
+            # which stays small (one ~250 word answer).
+            try:
+                parsed = parse_partial_json(self._args[message.id])
+            except ValueError:
+                # Too little of the object so far (e.g. only whitespace).
+                parsed = None
+            text = parsed.get(STREAM_FIELD) if isinstance(parsed, dict) else None
+        elif isinstance(message.content, str):
+            text = self._sent[message.id] + message.content
+        else:
+            text = None
+
+        sent = self._sent[message.id]
+        if isinstance(text, str) and len(text) > len(sent) and text.startswith(sent):
+            self._sent[message.id] = text
+            deltas.append(Delta("token", node, text=text[len(sent) :]))
+        return deltas
+
+
+def _stream_modes(stream_tokens: bool):
+    return ["updates", "messages"] if stream_tokens else ["updates"]
+
+
+def stream_deltas(
+    graph,
+    inputs,
+    config: Optional[dict] = None,
+    stream_tokens: bool = REFLEXION_STREAM_TOKENS,
+    token_nodes: Iterable[str] = ("revise",),
+) -> Iterator[Delta]:
+    """Run ``graph`` and yield only what each step adds.
+
+    Unlike ``stream_mode="values"``, no step re-sends the accumulated state,
+    so the cost per step does not grow with the conversation.
+    """
+
+    builder = _DeltaBuilder(token_nodes)
+    for mode, chunk in graph.stream(
+        inputs, config=config, stream_mode=_stream_modes(stream_tokens)
+    ):
+        yield from builder.feed(mode, chunk)
+
+
+async def astream_deltas(
+    graph,
+    inputs,
+    config: Optional[dict] = None,
+    stream_tokens: bool = REFLEXION_STREAM_TOKENS,
+    token_nodes: Iterable[str] = ("revise",),
+) -> AsyncIterator[Delta]:
+    builder = _DeltaBuilder(token_nodes)
+    async for mode, chunk in graph.astream(
+        inputs, config=config, stream_mode=_stream_modes(stream_tokens)
+    ):
+        for delta in builder.feed(mode, chunk):
+            yield delta
+
+
+class ConsoleRenderer:
+    """Prints deltas as they arrive, writing streamed answers inline."""
+
+    def __init__(self):
+        self.step = 0
+        self.streamed_nodes = set()
+
+    def render(self, delta: Delta) -> None:
+        if delta.kind == "token_start":
+            if delta.node in self.streamed_nodes:
+                print("\n[retrying]")
+            else:
+                print(f"Step {self.step} - {delta.node} (streaming)")
+            self.streamed_nodes.add(delta.node)
+        elif delta.kind == "token":
+            print(delta.text, end="", flush=True)
+        elif delta.kind == "update":
+            self._render_update(delta)
+
+    def _render_update(self, delta: Delta) -> None:
+        streamed = delta.node in self.streamed_nodes
+        self.streamed_nodes.discard(delta.node)
+        if streamed:
+            print()
+        else:
+            print(f"Step {self.step} - {delta.node}")
+        self.step += 1
+        for message in delta.messages:
+            tool_calls = getattr(message, "tool_calls", None)
+            if streamed and tool_calls:
+                # The answer is already on screen; show the rest of the call.
+                args = dict(tool_calls[0]["args"])
+                args.pop(STREAM_FIELD, None)
+                print(args)
+            else:
+                message.pretty_print()
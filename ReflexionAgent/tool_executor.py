@@ -1,49 +1,150 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Annotated, Dict, List, Union
+
+from compaction import COMPACTION_TOKEN_BUDGET, compact_messages
 from dotenv import load_dotenv
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
-from langchain_core.tools import StructuredTool
-from langgraph.prebuilt import ToolNode
+from evidence import EVIDENCE_CHAR_BUDGET, EvidenceStore, build_report
+from langgraph.prebuilt import InjectedState
 from schemas import AnswerQuestion, ReviseAnswer
 
 load_dotenv()
 
-wrapper = DuckDuckGoSearchAPIWrapper(max_results=3)
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "15"))
+
+
+# The search wrapper pulls in langchain_community and the DuckDuckGo client,
+# so it is only built once the first query runs.
+@lru_cache(maxsize=None)
+def get_wrapper():
+    from search_cache import CachedDuckDuckGoSearchAPIWrapper, SearchCache
+
+    return CachedDuckDuckGoSearchAPIWrapper(max_results=3, cache=SearchCache())
+
+
+@lru_cache(maxsize=None)
+def get_search_tool():
+    from langchain_community.tools import DuckDuckGoSearchRun
+
+    return DuckDuckGoSearchRun(api_wrapper=get_wrapper())
+
+
+# One pool shared by every query of every tool call, so the cap holds across
+# the whole ToolNode batch and not just within a single call.
+search_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_MAX_CONCURRENCY, thread_name_prefix="search"
+)
+
+
+SearchResults = Union[List[Dict[str, str]], str]
+
+
+def search_query(query: str) -> SearchResults:
+    """Run a single query; returns its raw results or an error message."""
+
+    try:
+        return get_wrapper().results(query, max_results=3)
+    except Exception as e:
+        return f"Error searching for {query}: {str(e)}"
 
-search_tool = DuckDuckGoSearchRun(api_wrapper=wrapper)
 
+def timeout_message(query: str) -> str:
+    return f"Error searching for {query}: timed out after {SEARCH_TIMEOUT:g}s"
 
-def run_queries(search_queries: list[str], **kwargs):
+
+def report(search_queries: list[str], results: List[SearchResults], state) -> str:
+    """Keep only evidence this run has not shown the model yet."""
+
+    messages = (state or {}).get("messages", [])
+    question = next(
+        (m.content for m in messages if getattr(m, "type", None) == "human"), ""
+    )
+    # Only evidence still visible to the next revise call counts as seen. That
+    # call also carries this report (about one token per 4 characters).
+    visible = compact_messages(
+        messages, budget=COMPACTION_TOKEN_BUDGET - EVIDENCE_CHAR_BUDGET // 4
+    )
+    store = EvidenceStore.from_messages(visible)
+    return build_report(str(question), search_queries, results, store)
+
+
+def run_queries(
+    search_queries: list[str],
+    state: Annotated[dict, InjectedState] = None,
+    **kwargs,
+):
     """Run the generated queries and return results with URLs."""
 
+    futures = [search_executor.submit(search_query, q) for q in search_queries]
+    # One deadline for the whole batch, as in arun_queries: each query gets
+    # SEARCH_TIMEOUT from submission, not from when the previous one ended.
+    done, _ = wait(futures, timeout=SEARCH_TIMEOUT)
+
     final_results = []
+    # Results are collected in submission order so the output stays
+    # deterministic no matter which search finishes first.
+    for query, future in zip(search_queries, futures):
+        if future in done:
+            final_results.append(future.result())
+        else:
+            future.cancel()
+            final_results.append(timeout_message(query))
+
+    return report(search_queries, final_results, state)
+
 
-    for query in search_queries:
+async def arun_queries(
+    search_queries: list[str],
+    state: Annotated[dict, InjectedState] = None,
+    **kwargs,
+):
+    """Run the generated queries concurrently and return results with URLs."""
 
+    loop = asyncio.get_running_loop()
+
+    async def run_one(query: str) -> SearchResults:
         try:
-            search_results = wrapper.results(query, max_results=3)
-
-            formatted_results = []
-            for res in search_results:
-                entry = (
-                    f"Content: {res['snippet']}\n"
-                    f"Source: {res['link']}\n"
-                    f"Title: {res['title']}"
-                )
-                formatted_results.append(entry)
-
-            final_results.append(
-                f"Query: {query}\n" + "\n---\n".join(formatted_results)
+            return await asyncio.wait_for(
+                loop.run_in_executor(search_executor, search_query, query),
+                timeout=SEARCH_TIMEOUT,
             )
+        except asyncio.TimeoutError:
+            return timeout_message(query)
 
-        except Exception as e:
-            final_results.append(f"Error searching for {query}: {str(e)}")
+    final_results = await asyncio.gather(*(run_one(q) for q in search_queries))
 
-    return "\n\n".join(final_results)
+    return report(search_queries, list(final_results), state)
 
 
-execute_tools = ToolNode(
-    [
-        StructuredTool.from_function(run_queries, name=AnswerQuestion.__name__),
-        StructuredTool.from_function(run_queries, name=ReviseAnswer.__name__),
-    ]
-)
+@lru_cache(maxsize=None)
+def get_execute_tools():
+    from langchain_core.tools import StructuredTool
+    from langgraph.prebuilt import ToolNode
+
+    return ToolNode(
+        [
+            StructuredTool.from_function(
+                run_queries, coroutine=arun_queries, name=AnswerQuestion.__name__
+            ),
+            StructuredTool.from_function(
+                run_queries, coroutine=arun_queries, name=ReviseAnswer.__name__
+            ),
+        ]
+    )
+
+
+_LAZY_ATTRIBUTES = {
+    "wrapper": get_wrapper,
+    "search_cache": lambda: get_wrapper().cache,
+    "search_tool": get_search_tool,
+    "execute_tools": get_execute_tools,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
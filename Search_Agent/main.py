@@ -1,3 +1,4 @@
+import re
 from typing import List
 
 from dotenv import load_dotenv
@@ -6,18 +7,26 @@ from pydantic import BaseModel, Field
 load_dotenv()
 import os
 
-import httpx
+from agent_common.http_clients import (get_async_http_client, get_http_client,
+                                       pool_stats, rate_limit_stats)
 from langchain_community.tools import DuckDuckGoSearchResults
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import (AIMessage, BaseMessage, HumanMessage,
+                                     ToolMessage)
 from langchain_core.tools import tool
 from langchain_openai import AzureChatOpenAI
 from langgraph.prebuilt import create_react_agent
+from search_cache import CachedDuckDuckGoSearchAPIWrapper, SearchCache
 
 AZURE_ENDPOINT = os.getenv("azure_endpoint")
 API_KEY = os.getenv("api_key")
 API_VERSION = os.getenv("azure_api_version")
+# Build AgentResponse locally from the final turn and the search results
+# instead of asking the model to restate its answer in a second call.
+SEARCH_SINGLE_PASS = os.getenv("SEARCH_SINGLE_PASS", "1") == "1"
 
-custom_http_client = httpx.Client(verify=False, timeout=60.0)
+_LINK = re.compile(r"link: (https?://[^\s,]+)")
+
+http_client = get_http_client(verify=False)
 
 
 class Source(BaseModel):
@@ -35,7 +44,7 @@ class AgentResponse(BaseModel):
 def get_user_location() -> str:
     """Get the user's current location based on IP address."""
     try:
-        response = custom_http_client.get("https://ipapi.co/json/", timeout=10.0)
+        response = http_client.get("https://ipapi.co/json/", timeout=10.0)
         if response.status_code == 200:
             data = response.json()
             city = data.get("city", "Unknown")
@@ -52,17 +61,63 @@ llm = AzureChatOpenAI(
     azure_endpoint=AZURE_ENDPOINT,
     api_key=API_KEY,
     api_version=API_VERSION,
-    http_client=custom_http_client,
+    http_client=http_client,
+    http_async_client=get_async_http_client(verify=False),
+    # The shared rate limiter retries; SDK retries would multiply its attempts.
+    max_retries=0,
     temperature=0,
 )
 
-tools = [get_user_location, DuckDuckGoSearchResults(max_results=5)]
+search_cache = SearchCache()
+
+tools = [
+    get_user_location,
+    DuckDuckGoSearchResults(
+        max_results=5,
+        api_wrapper=CachedDuckDuckGoSearchAPIWrapper(cache=search_cache),
+    ),
+]
+
+
+def extract_sources(messages: List[BaseMessage]) -> List[Source]:
+    """Every result URL the search tool returned, in first-seen order."""
+
+    urls = []
+    for message in messages:
+        if not isinstance(message, ToolMessage):
+            continue
+        # DuckDuckGoSearchResults keeps the raw results as the artifact.
+        if isinstance(message.artifact, list):
+            links = [r.get("link") for r in message.artifact if isinstance(r, dict)]
+        else:
+            links = _LINK.findall(str(message.content))
+        urls.extend(link for link in links if link and link not in urls)
+    return [Source(url=url) for url in urls]
+
+
+def get_response(result: dict) -> AgentResponse:
+    if result.get("structured_response"):
+        return result["structured_response"]
+    answer = next(
+        (
+            m.text
+            for m in reversed(result["messages"])
+            if isinstance(m, AIMessage) and not m.tool_calls
+        ),
+        "",
+    )
+    return AgentResponse(answer=answer, sources=extract_sources(result["messages"]))
+
+
+def build_agent(model):
+    return create_react_agent(
+        model=model,
+        tools=tools,
+        response_format=None if SEARCH_SINGLE_PASS else AgentResponse,
+    )
 
-agent = create_react_agent(
-    model=llm,
-    tools=tools,
-    response_format=AgentResponse,
-)
+
+agent = build_agent(llm)
 
 
 def main():
@@ -80,18 +135,21 @@ def main():
             config={"recursion_limit": 15},
         )
 
-        if "structured_response" in result:
-            response = result["structured_response"]
-            print("=== ANSWER ===")
-            print(response.answer)
-            print("\n=== SOURCES ===")
-            if response.sources:
-                for i, source in enumerate(response.sources, 1):
-                    print(f"{i}.  {source.url}")
+        response = get_response(result)
+        print("=== ANSWER ===")
+        print(response.answer)
+        print("\n=== SOURCES ===")
+        if response.sources:
+            for i, source in enumerate(response.sources, 1):
+                print(f"{i}.  {source.url}")
 
     except Exception as e:
         print(f"Error: {type(e).__name__}: {e}")
 
+    print(f"\nSearch cache: {search_cache.stats()}")
+    print(f"HTTP pool: {pool_stats()}")
+    print(f"Rate limiter: {rate_limit_stats()}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+load_dotenv()
+
+SEARCH_CACHE_PATH = os.getenv(
+    "SEARCH_CACHE_PATH", os.path.expanduser("~/.cache/ai-agents/search_cache.db")
+)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 60 * 60)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_query(query: str) -> str:
+    # Case, surrounding punctuation and repeated whitespace rarely change
+    # what a search engine returns, so they should not change the key either.
+    query = re.sub(r"\s+", " ", query.casefold()).strip()
+    return query.strip(" ?!.,;:'\"")
+
+
+class SearchCache:
+    """SQLite backed search-result cache with TTL expiry and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str = SEARCH_CACHE_PATH,
+        ttl: float = SEARCH_CACHE_TTL,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS search_cache_accessed_at "
+                "ON search_cache (accessed_at)"
+            )
+
+    @staticmethod
+    def make_key(query: str, max_results: int, source: Optional[str] = None) -> str:
+        return f"{source or 'text'}|{max_results}|{normalize_query(query)}"
+
+    def get(
+        self, query: str, max_results: int, source: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        key = self.make_key(query, max_results, source)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT results, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(
+        self,
+        query: str,
+        max_results: int,
+        results: List[Dict[str, Any]],
+        source: Optional[str] = None,
+    ) -> None:
+        key = self.make_key(query, max_results, source)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(results), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,)
+        )
+        # Least recently read entries go first once the cache is over size.
+        self._conn.execute(
+            """
+            DELETE FROM search_cache WHERE key IN (
+                SELECT key FROM search_cache ORDER BY accessed_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM search_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size,
+        }
+
+
+class CachedDuckDuckGoSearchAPIWrapper(DuckDuckGoSearchAPIWrapper):
+    """DuckDuckGo wrapper that serves repeated queries from a SearchCache."""
+
+    cache: Any = None
+
+    def results(
+        self, query: str, max_results: int, source: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        if self.cache is None:
+            return super().results(query, max_results, source=source)
+
+        cached = self.cache.get(query, max_results, source)
+        if cached is not None:
+            return cached
+
+        results = super().results(query, max_results, source=source)
+        # The wrapper reports "no results" as a placeholder entry without a link;
+        # that is usually rate limiting, so it is not worth remembering.
+        if results and all("link" in res for res in results):
+            self.cache.set(query, max_results, results, source)
+        return results
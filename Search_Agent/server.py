@@ -0,0 +1,53 @@
+"""HTTP service for the search agent.
+
+python server.py
+curl -N localhost:8000/runs -d '{"input": "...", "stream": true}'
+"""
+
+from agent_common.agent_service import (AgentService, Emit, create_app,
+                                        serialize_message, serve)
+from agent_common.http_clients import pool_stats, rate_limit_stats
+from main import agent, get_response, search_cache
+
+
+async def run(input: str, emit: Emit) -> dict:
+    values = None
+    async for mode, chunk in agent.astream(
+        {"messages": [("user", input)]},
+        config={"recursion_limit": 15},
+        stream_mode=["updates", "values"],
+    ):
+        if mode == "values":
+            values = chunk
+            continue
+        for node, update in chunk.items():
+            new_messages = (update or {}).get("messages", [])
+            if not isinstance(new_messages, list):
+                new_messages = [new_messages]
+            if new_messages:
+                await emit(
+                    "step",
+                    {
+                        "node": node,
+                        "messages": [serialize_message(m) for m in new_messages],
+                    },
+                )
+    if values is None:
+        raise RuntimeError("Agent returned no state")
+    return get_response(values).model_dump()
+
+
+service = AgentService(run)
+app = create_app(
+    service,
+    "Search Agent",
+    stats=lambda: {
+        "search_cache": search_cache.stats(),
+        "http_pool": pool_stats(),
+        "rate_limiter": rate_limit_stats(),
+    },
+)
+
+
+if __name__ == "__main__":
+    serve(app)
@@ -1,19 +1,29 @@
+import asyncio
+import json
 import os
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
-import httpx
-from callbacks import AgentCallbackHandler
+from agent_common.callbacks import AgentCallbackHandler, MetricsCallbackHandler
+from agent_common.http_clients import (get_async_http_client, get_http_client,
+                                       pool_stats, rate_limit_stats)
+from agent_common.llm_cache import LLMResponseCache
+from agent_common.loop_guard import (LoopGuard, ToolMemo, loop_stats,
+                                     normalize_args, repeat_note)
+from agent_common.tool_registry import ToolRegistry
 from dotenv import load_dotenv
-from langchain.tools import BaseTool, tool
-from langchain_core.messages import HumanMessage, ToolMessage
+from langchain.tools import tool
+from langchain_core.messages import (AIMessage, BaseMessage, HumanMessage,
+                                     ToolMessage, message_chunk_to_message)
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
+from pydantic import ValidationError
 
 load_dotenv()
 
 AUTH_CODE = os.getenv("AUTH_CODE")
 BASE_URL = os.getenv("BASE_URL")
-
-custom_http_client = httpx.Client(verify=False, timeout=60.0)
+VERBOSE = os.getenv("AGENT_VERBOSE", "").lower() in ("1", "true", "yes")
+SPECULATIVE_TOOLS = os.getenv("SPECULATIVE_TOOLS", "0") == "1"
 
 
 @tool
@@ -27,25 +37,274 @@ def get_text_length(text: str) -> int:
     return len(text)
 
 
-def find_tool_by_name(tools: List[BaseTool], tool_name: str) -> BaseTool:
-    for tool in tools:
-        if tool.name == tool_name:
-            return tool
+async def run_tool_call(
+    registry: ToolRegistry,
+    tool_call: dict,
+    config: Optional[RunnableConfig] = None,
+    memo: Optional[ToolMemo] = None,
+) -> ToolMessage:
+    tool_name = tool_call.get("name")
+    tool_args = tool_call.get("args", {})
+    print(f"args: {tool_args}")
+    tool_call_id = tool_call.get("id")
 
-    raise ValueError(f"Tool with name {tool_name} not found.")
+    try:
+        tool_to_use = registry.get(tool_name)
+        registry.validate(tool_name, tool_args)
+    except ValidationError as e:
+        # Let the model see the schema problem and fix its call.
+        return ToolMessage(
+            content=f"Invalid arguments for {tool_name}: {e}",
+            tool_call_id=tool_call_id,
+            status="error",
+        )
+    except ValueError as e:
+        # An unknown (e.g. hallucinated) tool name: list the real ones.
+        return ToolMessage(
+            content=f"{e} Available tools: {registry.tool_names()}.",
+            tool_call_id=tool_call_id,
+            status="error",
+        )
+    if memo is None:
+        observation = await tool_to_use.ainvoke(tool_args, config=config)
+    else:
+        observation = await memo.acall(
+            tool_name, tool_args, lambda: tool_to_use.ainvoke(tool_args, config=config)
+        )
 
+    print(f"observation={observation}")
+
+    return ToolMessage(content=str(observation), tool_call_id=tool_call_id)
+
+
+def parse_complete_args(args: Optional[str]) -> Optional[dict]:
+    """Return the arguments once the streamed JSON object is complete."""
+
+    if not args:
+        return None
+    try:
+        parsed = json.loads(args)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+SpeculativeCalls = Dict[str, Tuple[dict, asyncio.Task]]
+
+
+async def astream_turn(
+    llm_with_tools,
+    registry: ToolRegistry,
+    messages: List[BaseMessage],
+    config: Optional[RunnableConfig] = None,
+    memo: Optional[ToolMemo] = None,
+    guard: Optional[LoopGuard] = None,
+) -> Tuple[AIMessage, SpeculativeCalls]:
+    """Stream one model turn, starting each tool as soon as its call is complete.
+
+    A JSON object cannot be extended once it parses, so a call whose argument
+    string is valid JSON is final even while later calls are still streaming.
+    With a ``guard``, only calls the run has not made before start early:
+    those are the ones ``check_actions`` cannot stop or flag. Returns the
+    message and the started calls by id, for ``collect_tool_messages``.
+    """
+
+    full = None
+    started: SpeculativeCalls = {}
+    early = set()
+
+    try:
+        async for chunk in llm_with_tools.astream(messages, config=config):
+            full = chunk if full is None else full + chunk
+            # Models without streaming yield one whole AIMessage instead.
+            for tool_call_chunk in getattr(full, "tool_call_chunks", []):
+                tool_call_id = tool_call_chunk.get("id")
+                if not tool_call_id or tool_call_id in started:
+                    continue
+                args = parse_complete_args(tool_call_chunk.get("args"))
+                if args is None or not tool_call_chunk.get("name"):
+                    continue
+                tool_call = {
+                    "name": tool_call_chunk["name"],
+                    "args": args,
+                    "id": tool_call_id,
+                }
+                if guard:
+                    key = (tool_call["name"], normalize_args(args))
+                    if key in early or not guard.is_new(tool_call["name"], args):
+                        continue
+                    early.add(key)
+                task = asyncio.create_task(
+                    run_tool_call(registry, tool_call, config, memo)
+                )
+                started[tool_call_id] = (tool_call, task)
+    except BaseException:
+        cancel_calls(started)
+        raise
+
+    return message_chunk_to_message(full), started
 
-def main():
-    print("Hello from toolcalling-agent!")
 
-    tools = [get_text_length]
+async def collect_tool_messages(
+    registry: ToolRegistry,
+    tool_calls: List[dict],
+    started: SpeculativeCalls,
+    config: Optional[RunnableConfig] = None,
+    memo: Optional[ToolMemo] = None,
+) -> List[ToolMessage]:
+    """Results of ``tool_calls``, reusing the speculative runs that match.
+
+    Reconciles against the final parsed calls so the ToolMessages follow the
+    model's order and match the arguments it actually sent.
+    """
+
+    pending = []
+    try:
+        for tool_call in tool_calls:
+            speculative = started.pop(tool_call["id"], None)
+            if speculative and speculative[0]["args"] == tool_call["args"]:
+                pending.append(speculative[1])
+            else:
+                if speculative:
+                    speculative[1].cancel()
+                pending.append(run_tool_call(registry, tool_call, config, memo))
+        return list(await asyncio.gather(*pending))
+    finally:
+        cancel_calls(started)
+
+
+def cancel_calls(started: SpeculativeCalls) -> None:
+    for _, task in started.values():
+        task.cancel()
+
+
+async def arun_agent(
+    llm_with_tools,
+    registry: ToolRegistry,
+    messages: List[BaseMessage],
+    config: Optional[RunnableConfig] = None,
+    on_step: Optional[Callable[[List[BaseMessage]], Awaitable[None]]] = None,
+    guard: Optional[LoopGuard] = None,
+) -> AIMessage:
+    """Run the tool loop until the model answers without tool calls.
+
+    ``on_step`` is awaited with the new messages of every turn (the model
+    reply plus its tool results), e.g. to stream progress to a client.
+    ``guard`` enforces the step and time budgets and catches repeated calls;
+    a stopped run returns an AIMessage with ``stop_reason`` in its metadata.
+    """
+
+    guard = guard or LoopGuard()
+    memo = ToolMemo(registry.is_pure)
+
+    while True:
+        stop_reason = guard.over_budget()
+        if stop_reason:
+            return await stopped(stop_reason, on_step)
+
+        if SPECULATIVE_TOOLS:
+            ai_messages, started = await astream_turn(
+                llm_with_tools, registry, messages, config, memo, guard
+            )
+        else:
+            ai_messages = await llm_with_tools.ainvoke(messages, config=config)
+            started = None
+
+        tool_calls = getattr(ai_messages, "tool_calls", None) or []
+
+        if len(tool_calls) > 0:
+            stop_reason, repeated = guard.check_actions(
+                [(call["name"], call.get("args", {})) for call in tool_calls]
+            )
+            if stop_reason:
+                if started:
+                    cancel_calls(started)
+                return await stopped(stop_reason, on_step)
 
-    llm = ChatOpenAI(
+            messages.append(ai_messages)
+
+            if started is not None:
+                tool_messages = await collect_tool_messages(
+                    registry, tool_calls, started, config, memo
+                )
+            else:
+                # All calls of one turn run concurrently; gather keeps the
+                # results in the order the model emitted the calls.
+                tool_messages = await asyncio.gather(
+                    *(
+                        run_tool_call(registry, tool_call, config, memo)
+                        for tool_call in tool_calls
+                    )
+                )
+            # Repeats get their (memoized) result plus a nudge to move on.
+            for i, (tool_call, again) in enumerate(zip(tool_calls, repeated)):
+                if again:
+                    content = f"{tool_messages[i].content}\n\n"
+                    content += repeat_note(tool_call["name"])
+                    tool_messages[i] = tool_messages[i].model_copy(
+                        update={"content": content}
+                    )
+            messages.extend(tool_messages)
+            if on_step:
+                await on_step([ai_messages, *tool_messages])
+
+            continue
+
+        # No tool calls -> final answer
+        if started:
+            cancel_calls(started)
+        if on_step:
+            await on_step([ai_messages])
+        return ai_messages
+
+
+async def stopped(
+    reason: str, on_step: Optional[Callable[[List[BaseMessage]], Awaitable[None]]]
+) -> AIMessage:
+    print(f"Agent stopped: {reason}")
+    ai_message = AIMessage(
+        content=f"Stopped before a final answer: {reason}.",
+        response_metadata={"stop_reason": reason},
+    )
+    if on_step:
+        await on_step([ai_message])
+    return ai_message
+
+
+async def arun_conversations(
+    llm_with_tools,
+    registry: ToolRegistry,
+    prompts: List[str],
+    config: Optional[RunnableConfig] = None,
+) -> List[AIMessage]:
+    """Run several independent conversations on the same event loop."""
+
+    return await asyncio.gather(
+        *(
+            arun_agent(llm_with_tools, registry, [HumanMessage(content=prompt)], config)
+            for prompt in prompts
+        )
+    )
+
+
+def build_callbacks() -> list:
+    callbacks = [MetricsCallbackHandler()]
+    if VERBOSE:
+        callbacks.append(AgentCallbackHandler())
+    return callbacks
+
+
+def build_llm(llm_cache: LLMResponseCache) -> ChatOpenAI:
+    return ChatOpenAI(
         temperature=0,
         base_url=BASE_URL,
         api_key=AUTH_CODE,
         model="gpt-oss-120b",
-        callbacks=[AgentCallbackHandler()],
+        cache=llm_cache,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        # The shared rate limiter retries; SDK retries would multiply its attempts.
+        max_retries=0,
         extra_body={
             "reasoning": {
                 "effort": "high",  # "low" | "medium" | "high"
@@ -53,38 +312,31 @@ def main():
         },
     )
 
-    llm_with_tools = llm.bind_tools(tools)
 
-    messages = [HumanMessage(content="What is the length of the word: DOG")]
+def main():
+    print("Hello from toolcalling-agent!")
 
-    while True:
-        ai_messages = llm_with_tools.invoke(messages)
+    registry = ToolRegistry([get_text_length], pure=["get_text_length"])
 
-        tool_calls = getattr(ai_messages, "tool_calls", None) or []
+    llm_cache = LLMResponseCache()
 
-        if len(tool_calls) > 0:
-            messages.append(ai_messages)
+    llm = build_llm(llm_cache)
 
-            for tool_call in tool_calls:
-                tool_name = tool_call.get("name")
-                tool_args = tool_call.get("args", {})
-                print(f"args: {tool_args}")
-                tool_call_id = tool_call.get("id")
+    llm_with_tools = llm.bind_tools(registry.openai_schemas())
 
-                tool_to_use = find_tool_by_name(tools, tool_name)
-                observation = tool_to_use.invoke(tool_args)
+    messages = [HumanMessage(content="What is the length of the word: DOG")]
 
-                print(f"observation={observation}")
+    # Passed through the run config so tool calls are traced as well.
+    config = {"callbacks": build_callbacks()}
 
-                messages.append(
-                    ToolMessage(content=str(observation), tool_call_id=tool_call_id)
-                )
+    ai_message = asyncio.run(arun_agent(llm_with_tools, registry, messages, config))
 
-            continue
+    print(ai_message.content)
 
-        # No tool calls -> final answer
-        print(ai_messages.content)
-        break
+    print(f"LLM cache: {llm_cache.stats()}")
+    print(f"HTTP pool: {pool_stats()}")
+    print(f"Rate limiter: {rate_limit_stats()}")
+    print(f"Loop guard: {loop_stats()}")
 
 
 if __name__ == "__main__":
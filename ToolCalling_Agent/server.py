@@ -0,0 +1,59 @@
+"""HTTP service for the tool-calling agent.
+
+python server.py
+curl -N localhost:8000/runs -d '{"input": "Length of DOG?", "stream": true}'
+"""
+
+from agent_common.agent_service import (AgentService, Emit, create_app,
+                                        serialize_message, serve)
+from agent_common.http_clients import pool_stats, rate_limit_stats
+from agent_common.llm_cache import LLMResponseCache
+from agent_common.loop_guard import loop_stats
+from agent_common.tool_registry import ToolRegistry
+from langchain_core.messages import HumanMessage
+from main import arun_agent, build_callbacks, build_llm, get_text_length
+
+registry = ToolRegistry([get_text_length], pure=["get_text_length"])
+llm_cache = LLMResponseCache()
+llm_with_tools = None
+# One metrics handler for the whole service: each handler owns a writer
+# thread and the metrics files, and its Prometheus totals cover every run.
+run_config = None
+
+
+def warm():
+    global llm_with_tools, run_config
+    llm_with_tools = build_llm(llm_cache).bind_tools(registry.openai_schemas())
+    run_config = {"callbacks": build_callbacks()}
+
+
+async def run(input: str, emit: Emit) -> str:
+    async def on_step(messages):
+        await emit("step", [serialize_message(m) for m in messages])
+
+    ai_message = await arun_agent(
+        llm_with_tools,
+        registry,
+        [HumanMessage(content=input)],
+        run_config,
+        on_step=on_step,
+    )
+    return ai_message.content
+
+
+service = AgentService(run)
+app = create_app(
+    service,
+    "ToolCalling Agent",
+    warm=warm,
+    stats=lambda: {
+        "llm_cache": llm_cache.stats(),
+        "loop_guard": loop_stats(),
+        "http_pool": pool_stats(),
+        "rate_limiter": rate_limit_stats(),
+    },
+)
+
+
+if __name__ == "__main__":
+    serve(app)
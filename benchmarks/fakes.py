@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+# A script maps (messages, names of the bound tools) to the next reply.
+Script = Callable[[List[BaseMessage], List[str]], AIMessage]
+
+
+def new_stats() -> Dict[str, int]:
+    return {"llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "tool_rounds": 0}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model that answers from a script.
+
+    Replies get approximate ``usage_metadata`` so token counts flow through
+    callbacks the same way as with the real endpoint. Copies made with
+    ``model_copy`` share ``stats``.
+    """
+
+    script: Script
+    latency: float = 0.0
+    stop: Optional[List[str]] = None
+    stats: Dict[str, int] = Field(default_factory=new_stats)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(
+            tools=[convert_to_openai_tool(t) for t in tools],
+            tool_choice=tool_choice,
+            **kwargs,
+        )
+
+    def _reply(self, messages: List[BaseMessage], stop, tools) -> ChatResult:
+        names = [t["function"]["name"] for t in tools or []]
+        message = self.script(messages, names)
+        content = message.content
+        for marker in stop or self.stop or []:
+            if isinstance(content, str) and marker in content:
+                content = content[: content.index(marker)]
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message = message.model_copy(
+            update={
+                "content": content,
+                "usage_metadata": {
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                },
+            }
+        )
+        self.stats["llm_calls"] += 1
+        self.stats["input_tokens"] += input_tokens
+        self.stats["output_tokens"] += output_tokens
+        self.stats["tool_rounds"] += bool(
+            message.tool_calls or "Action Input:" in str(content)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(messages, stop, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(messages, stop, kwargs.get("tools"))
+
+
+class FakeSearch:
+    """Stands in for DuckDuckGoSearchAPIWrapper: same ``results`` signature,
+    stable results per query and a fixed latency per call."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def results(
+        self, query: str, max_results: int = 3, source: Any = None
+    ) -> List[Dict[str, str]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha1(query.encode()).hexdigest()[:8]
+        return [
+            {
+                "snippet": f"Result {i} for {query}: figures, dates and context "
+                f"about {query} reported by source {digest}-{i}.",
+                "title": f"{query} ({i})",
+                "link": f"https://example.com/{digest}/{i}",
+            }
+            for i in range(max_results)
+        ]
@@ -0,0 +1,220 @@
+"""Drive N concurrent agent sessions against the local stub server.
+
+The real agent code runs here (the ToolCalling loop or the Reflexion graph)
+with BASE_URL pointed at stub_server.py, started as a subprocess unless
+--base-url names a running endpoint. Sessions run closed-loop at
+--concurrency, or open-loop at --rate sessions per second (still capped by
+--concurrency). Reflexion searches use the fake backend unless
+--real-search is given.
+
+    python benchmarks/load_test.py toolcalling --sessions 200 --concurrency 20
+    python benchmarks/load_test.py reflexion --rate 2 --sessions 50 \\
+        --stub-latency 0.5 --stub-rate-limit-rate 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PROJECTS = {"toolcalling": "ToolCalling_Agent", "reflexion": "ReflexionAgent"}
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile; ``q`` in [0, 100]."""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def stub_server(args: argparse.Namespace):
+    if args.base_url:
+        yield args.base_url
+        return
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(HERE, "stub_server.py"),
+            "--port",
+            str(port),
+            "--latency",
+            str(args.stub_latency),
+            "--rate-limit-rate",
+            str(args.stub_rate_limit_rate),
+            "--error-rate",
+            str(args.stub_error_rate),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        for _ in range(100):
+            with contextlib.suppress(OSError):
+                fetch_stats(base_url)
+                break
+            time.sleep(0.05)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def fetch_stats(base_url: str) -> dict:
+    url = base_url.rsplit("/v1", 1)[0] + "/stats"
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.load(response)
+
+
+def toolcalling_session(args: argparse.Namespace):
+    from agent_common.llm_cache import LLMResponseCache
+    from agent_common.tool_registry import ToolRegistry
+    from langchain_core.messages import HumanMessage
+    from main import arun_agent, build_llm, get_text_length
+
+    registry = ToolRegistry([get_text_length], pure=["get_text_length"])
+    llm_with_tools = build_llm(LLMResponseCache(bypass=True)).bind_tools(
+        registry.openai_schemas()
+    )
+
+    async def session(i: int):
+        messages = [HumanMessage(content=f"What is the length of the word: W{i}")]
+        await arun_agent(llm_with_tools, registry, messages)
+
+    return session
+
+
+def reflexion_session(args: argparse.Namespace):
+    import tool_executor
+    from reflexion_graph import get_graph
+
+    if not args.real_search:
+        from fakes import FakeSearch
+
+        search = FakeSearch(latency=args.search_latency)
+        tool_executor.get_wrapper = lambda: search
+    graph = get_graph()
+
+    async def session(i: int):
+        await graph.ainvoke(
+            {"messages": [("user", f"Question {i}: how is the aviation sector?")]}
+        )
+
+    return session
+
+
+SESSIONS = {"toolcalling": toolcalling_session, "reflexion": reflexion_session}
+
+
+async def run_load(session, sessions: int, concurrency: int, rate: float):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], Counter()
+
+    async def one(i: int):
+        # Timed from when the session is issued, so open-loop queueing shows.
+        issued = time.perf_counter()
+        async with semaphore:
+            try:
+                await session(i)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                return
+        latencies.append(time.perf_counter() - issued)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(sessions):
+        if rate:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("agent", choices=sorted(SESSIONS))
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="Sessions per second (open loop)"
+    )
+    parser.add_argument("--base-url", help="Use this endpoint instead of the stub")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--stub-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--real-search", action="store_true")
+    args = parser.parse_args()
+
+    project = os.path.join(ROOT, PROJECTS[args.agent])
+    sys.path[:0] = [project, os.path.join(ROOT, "common")]
+    os.chdir(project)
+
+    with stub_server(args) as base_url:
+        # The agents read these at import time.
+        os.environ["BASE_URL"] = base_url
+        os.environ.setdefault("AUTH_CODE", "load-test")
+        os.environ["LLM_CACHE_BYPASS"] = "1"
+        session = SESSIONS[args.agent](args)
+
+        stats_before = {} if args.base_url else fetch_stats(base_url)
+        # The agents print every step; keep the report readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, latencies, errors = asyncio.run(
+                run_load(session, args.sessions, args.concurrency, args.rate)
+            )
+        stats_after = {} if args.base_url else fetch_stats(base_url)
+
+    from agent_common.http_clients import pool_stats, rate_limit_stats
+
+    failed = sum(errors.values())
+    mode = f"rate={args.rate}/s" if args.rate else "closed loop"
+    print(
+        f"{args.agent}: {args.sessions} sessions, concurrency={args.concurrency}, {mode}"
+    )
+    print(f"  elapsed      {elapsed:.2f} s")
+    print(f"  throughput   {len(latencies) / elapsed:.2f} sessions/s")
+    print(
+        f"  latency      p50 {percentile(latencies, 50):.3f} s  "
+        f"p95 {percentile(latencies, 95):.3f} s  p99 {percentile(latencies, 99):.3f} s"
+    )
+    print(f"  errors       {failed} ({failed / args.sessions:.1%}) {dict(errors)}")
+    if stats_after:
+        llm = {k: stats_after[k] - stats_before.get(k, 0) for k in stats_after}
+        requests = llm["requests"] or 1
+        print(
+            f"  llm requests {llm['requests']} "
+            f"({llm['requests'] / elapsed:.1f}/s, {llm['streamed']} streamed), "
+            f"429 {llm['status_429'] / requests:.1%}, "
+            f"5xx {llm['status_500'] / requests:.1%}, "
+            f"cached prompt {llm['cached_tokens'] / (llm['prompt_tokens'] or 1):.1%}"
+        )
+    print(f"  http pool    {pool_stats()}")
+    print(f"  rate limiter {rate_limit_stats()}")
+
+
+if __name__ == "__main__":
+    main()
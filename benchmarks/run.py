@@ -0,0 +1,203 @@
+"""Benchmark all four agents offline against a scripted LLM and fake search.
+
+Each agent runs end to end in its own interpreter (see scenarios.py) with a
+deterministic chat model and a search backend with configurable latency, so
+no API key or network access is needed. Results are compared against
+baseline.json: LLM calls, tokens and iterations are deterministic and must
+not grow. Timings and memory depend on the machine, so they are only shown
+next to the baseline unless --gate-timings is given; then the medians of
+--repeat runs of each agent must stay within --tolerance.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --agents reflexion react --runs 10
+    python benchmarks/run.py --gate-timings --repeat 5
+    python benchmarks/run.py --update-baseline --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+# The agents' shared package, importable without installing the projects.
+COMMON = os.path.join(ROOT, "common")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+
+AGENTS = {
+    "reflexion": "ReflexionAgent",
+    "search": "Search_Agent",
+    "toolcalling": "ToolCalling_Agent",
+    "react": "Old_ReAct_Agent",
+}
+
+EXACT_METRICS = ("llm_calls", "input_tokens", "output_tokens", "iterations")
+# Absolute slack on top of --tolerance, so millisecond-scale noise on tiny
+# runs is not reported as a regression with --gate-timings.
+TIMING_METRICS = {"wall_ms": 10.0, "cold_ms": 25.0, "peak_mem_kb": 64.0}
+COLUMNS = ("wall_ms", "cold_ms", "setup_ms") + EXACT_METRICS + ("peak_mem_kb",)
+
+
+def run_agent(agent: str, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join([HERE, COMMON]),
+            # Dummy credentials; every client the agents build is replaced.
+            "OPENAI_API_KEY": "bench",
+            "api_key": "bench",
+            "azure_endpoint": "https://bench.openai.azure.com",
+            "azure_api_version": "2024-06-01",
+            # Keep caches and metric sinks out of the user's files.
+            "LLM_CACHE_PATH": "",
+            "SEARCH_CACHE_PATH": os.path.join(tmp, "search_cache.db"),
+            "METRICS_JSONL_PATH": os.path.join(tmp, "metrics.jsonl"),
+            "METRICS_PROM_PATH": os.path.join(tmp, "metrics.prom"),
+        }
+        result = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(HERE, "scenarios.py"),
+                agent,
+                "--runs",
+                str(args.runs),
+                "--llm-latency",
+                str(args.llm_latency),
+                "--search-latency",
+                str(args.search_latency),
+            ],
+            cwd=os.path.join(ROOT, AGENTS[agent]),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"{agent} benchmark failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_repeated(agent: str, args: argparse.Namespace) -> dict:
+    """Median of each metric over ``args.repeat`` fresh runs of ``agent``."""
+
+    samples = [run_agent(agent, args) for _ in range(args.repeat)]
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def compare(
+    name: str, current: dict, baseline: dict, tolerance: float, timings: bool
+) -> list:
+    """Return regression messages for one agent."""
+
+    regressions = []
+    for metric in EXACT_METRICS:
+        if metric in baseline and current[metric] > baseline[metric]:
+            regressions.append(
+                f"{name}.{metric}: {baseline[metric]} -> {current[metric]}"
+            )
+    for metric, slack in TIMING_METRICS.items() if timings else ():
+        limit = baseline.get(metric, 0) * (1 + tolerance) + slack
+        if baseline.get(metric) and current[metric] > limit:
+            change = current[metric] / baseline[metric] - 1
+            regressions.append(
+                f"{name}.{metric}: {baseline[metric]} -> {current[metric]} "
+                f"(+{change:.0%})"
+            )
+    return regressions
+
+
+def format_row(name: str, values: dict, baseline: dict) -> str:
+    cells = []
+    for column in COLUMNS:
+        cell = f"{values[column]:g}"
+        if baseline.get(column):
+            cell += f" ({values[column] / baseline[column] - 1:+.0%})"
+        cells.append(f"{cell:>18}")
+    return f"{name:<12}" + "".join(cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--agents", nargs="+", choices=sorted(AGENTS), default=list(AGENTS)
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call"
+    )
+    parser.add_argument(
+        "--search-latency",
+        type=float,
+        default=0.05,
+        help="Seconds per fake search call",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Run each agent this many times and use the medians",
+    )
+    parser.add_argument(
+        "--gate-timings",
+        action="store_true",
+        help="Also fail when timings or memory grow beyond --tolerance "
+        "(only meaningful on the machine that recorded the baseline)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed relative growth of timings and memory with --gate-timings",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store these results as the new baseline",
+    )
+    args = parser.parse_args()
+
+    settings = {
+        "runs": args.runs,
+        "llm_latency": args.llm_latency,
+        "search_latency": args.search_latency,
+    }
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("settings") != settings:
+            print(f"Note: baseline was recorded with {stored.get('settings')}")
+
+    print(f"{'agent':<12}" + "".join(f"{c:>18}" for c in COLUMNS))
+    results, regressions = {}, []
+    for agent in args.agents:
+        results[agent] = run_repeated(agent, args)
+        baseline = stored.get("agents", {}).get(agent, {})
+        print(format_row(agent, results[agent], baseline))
+        regressions += compare(
+            agent, results[agent], baseline, args.tolerance, args.gate_timings
+        )
+
+    if args.update_baseline:
+        agents = {**stored.get("agents", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "agents": agents}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    if stored:
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Run one agent against the fakes and print its metrics as JSON.
+
+Started by ``run.py`` in a fresh interpreter whose working directory is the
+agent's project, because the four projects share module names (``main``,
+``server``, ...) and cannot be imported into one process.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+from fakes import FakeSearch, ScriptedChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, ToolMessage  # noqa: E402
+
+
+def _tool_call(name: str, args: dict, call_id: str) -> AIMessage:
+    return AIMessage(
+        content="", tool_calls=[{"name": name, "args": args, "id": call_id}]
+    )
+
+
+# Each round covers new ground, so convergence never stops the loop early and
+# the benchmark keeps measuring every search-and-revise iteration.
+REFLEXION_ROUNDS = [
+    ("revenue", "margins", "airlines", "quarterly", "carriers"),
+    ("fleet", "orders", "deliveries", "engines", "leasing"),
+    ("fuel", "hedging", "costs", "emissions", "surcharges"),
+    ("labour", "pilots", "unions", "wages", "staffing"),
+]
+
+
+def reflexion_script(messages, tools):
+    round_ = sum(isinstance(m, ToolMessage) for m in messages)
+    topics = REFLEXION_ROUNDS[round_ % len(REFLEXION_ROUNDS)]
+    name = tools[0] if tools else "AnswerQuestion"
+    args = {
+        "answer": " ".join(f"{' '.join(topics)} {i}." for i in range(20)),
+        "reflection": {
+            "missing": " ".join(
+                f"{topic} figures"
+                for topic in REFLEXION_ROUNDS[(round_ + 1) % len(REFLEXION_ROUNDS)]
+            ),
+            "superfluous": "Background on the history of the industry.",
+        },
+        "search_queries": [f"aviation {topic}" for topic in topics[:3]],
+    }
+    if name == "ReviseAnswer":
+        args["references"] = [f"https://example.com/ref/{round_}/{i}" for i in range(3)]
+    return _tool_call(name, args, f"call_{round_}")
+
+
+def toolcalling_script(messages, tools):
+    if any(isinstance(m, ToolMessage) for m in messages):
+        return AIMessage(content="The word DOG has 3 characters.")
+    return _tool_call("get_text_length", {"text": "DOG"}, "call_0")
+
+
+def react_script(messages, tools):
+    if re.search(r"Observation: \d", str(messages[-1].content)):
+        return AIMessage(
+            content="I now know the final answer\n"
+            "Final Answer: The word 'dog' has 3 characters."
+        )
+    # The trailing Observation is what the model hallucinates without a stop
+    # sequence; the agent has to cut it off.
+    return AIMessage(
+        content="I need the length of the word.\n"
+        "Action: get_text_length\nAction Input: dog\nObservation: 3\nThought:"
+    )
+
+
+def search_script(messages, tools):
+    if "AgentResponse" in tools:
+        text = " ".join(str(m.content) for m in messages)
+        links = sorted(set(re.findall(r"https://example\.com/[\w/]+", text)))
+        return _tool_call(
+            "AgentResponse",
+            {
+                "answer": "Three AI engineer roles using LangChain.",
+                "sources": [{"url": link} for link in links],
+            },
+            "call_response",
+        )
+    results = [m for m in messages if isinstance(m, ToolMessage)]
+    if not results:
+        return _tool_call("get_user_location", {}, "call_location")
+    if len(results) == 1:
+        search_tool = next(t for t in tools if "duckduckgo" in t)
+        return _tool_call(
+            search_tool, {"query": "AI engineer LangChain jobs Istanbul"}, "call_search"
+        )
+    return AIMessage(content="Here are three AI engineer postings using LangChain.")
+
+
+def setup_reflexion(model, search):
+    import chains
+    import tool_executor
+    from reflexion_graph import build_graph
+
+    chains.get_llm = lambda *args, **kwargs: model
+    tool_executor.get_wrapper = lambda: search
+    graph = build_graph()
+
+    def run():
+        state = graph.invoke(
+            {
+                "messages": [
+                    ("user", "Compare the latest results of aviation companies.")
+                ]
+            }
+        )
+        return state.get("iterations", 0)
+
+    return run
+
+
+def setup_toolcalling(model, search):
+    import main
+
+    main.build_llm = lambda llm_cache: model
+    return main.main
+
+
+def setup_react(model, search):
+    import main
+
+    main.ClientStopChatOpenAI = lambda **kwargs: model.model_copy(
+        update={"stop": kwargs.get("stop")}
+    )
+    return main.main
+
+
+def setup_search(model, search):
+    import httpx
+    import main
+
+    location = {"city": "Istanbul", "region": "Istanbul", "country_name": "Turkey"}
+    main.http_client = httpx.Client(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json=location)
+        )
+    )
+    main.tools[1].api_wrapper = search
+    agent = main.build_agent(model)
+
+    def run():
+        # main.main() swallows errors, so the agent is invoked directly.
+        result = agent.invoke(
+            {"messages": [("user", "Find 3 AI engineer jobs using LangChain.")]},
+            config={"recursion_limit": 15},
+        )
+        if not main.get_response(result).answer:
+            raise RuntimeError("agent returned no answer")
+        return sum(isinstance(m, ToolMessage) for m in result["messages"])
+
+    return run
+
+
+SCENARIOS = {
+    "reflexion": (setup_reflexion, reflexion_script),
+    "toolcalling": (setup_toolcalling, toolcalling_script),
+    "react": (setup_react, react_script),
+    "search": (setup_search, search_script),
+}
+
+
+def measure(agent: str, runs: int, llm_latency: float, search_latency: float):
+    setup, script = SCENARIOS[agent]
+    model = ScriptedChatModel(script=script, latency=llm_latency)
+    search = FakeSearch(latency=search_latency)
+
+    def timed_run():
+        stats_before = dict(model.stats)
+        started = time.perf_counter()
+        # The agents print their progress; keep it out of the report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            iterations = run()
+        elapsed = time.perf_counter() - started
+        delta = {k: model.stats[k] - stats_before[k] for k in model.stats}
+        if iterations is None:
+            iterations = delta["tool_rounds"]
+        return elapsed, delta, iterations
+
+    started = time.perf_counter()
+    run = setup(model, search)
+    setup_s = time.perf_counter() - started
+
+    # The first run pays for lazy imports and graph compilation.
+    cold_s, _, _ = timed_run()
+
+    walls, iterations = [], []
+    for _ in range(runs):
+        elapsed, delta, iters = timed_run()
+        walls.append(elapsed)
+        iterations.append(iters)
+
+    tracemalloc.start()
+    timed_run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "setup_ms": round(setup_s * 1000, 2),
+        "cold_ms": round(cold_s * 1000, 2),
+        "wall_ms": round(statistics.median(walls) * 1000, 2),
+        "wall_ms_min": round(min(walls) * 1000, 2),
+        "llm_calls": delta["llm_calls"],
+        "input_tokens": delta["input_tokens"],
+        "output_tokens": delta["output_tokens"],
+        "iterations": iterations[-1],
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("agent", choices=sorted(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    result = measure(args.agent, args.runs, args.llm_latency, args.search_latency)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""OpenAI-compatible chat completions stub for load tests.
+
+Point an agent's BASE_URL at it (http://127.0.0.1:PORT/v1). Requests that
+bind tools get a tool call whose arguments are generated from the tool's
+JSON schema; once the conversation holds a tool result, or when no tools
+are bound, the reply is plain text. Latency, SSE streaming and 429/5xx
+errors are configurable, and GET /stats returns request counters. Like a
+provider prefix cache, prompts sharing a long prefix with a recent request
+report that part as ``cached_tokens``.
+
+    python benchmarks/stub_server.py --port 8000 --latency 0.5 --error-rate 0.02
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Providers cache prompt prefixes from 1024 tokens on, in 128 token steps.
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+WORDS = (
+    "the quarterly results show steady growth in passenger demand while fuel "
+    "costs and fleet renewal weigh on margins across the largest carriers"
+).split()
+
+
+class StubConfig:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.25,
+        chunk_delay: float = 0.005,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: float = 1.0,
+        words: int = 60,
+        seed: int = 0,
+        cache_min_tokens: int = CACHE_MIN_TOKENS,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.words = words
+        self.cache_min_tokens = cache_min_tokens
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent_prompts = collections.deque(maxlen=64)
+        self.counters = {
+            "requests": 0,
+            "streamed": 0,
+            "tool_calls": 0,
+            "status_200": 0,
+            "status_429": 0,
+            "status_500": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    def count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def cached_tokens(self, prompt: str) -> int:
+        """Tokens of ``prompt`` a prefix cache would have seen recently."""
+
+        with self.lock:
+            shared = max(
+                (len(os.path.commonprefix([prompt, p])) for p in self.recent_prompts),
+                default=0,
+            )
+            self.recent_prompts.append(prompt)
+        tokens = shared // 4
+        if tokens < self.cache_min_tokens:
+            return 0
+        extra = tokens - self.cache_min_tokens
+        return self.cache_min_tokens + extra - extra % CACHE_STEP_TOKENS
+
+    def delay(self) -> float:
+        spread = self.latency * self.jitter
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-spread, spread))
+
+
+def text(words: int, seed: str) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def fake_value(schema: dict, name: str, defs: dict, words: int):
+    """A value that satisfies ``schema``, good enough for pydantic validation."""
+
+    if "$ref" in schema:
+        schema = defs.get(schema["$ref"].rsplit("/", 1)[-1], {})
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"]
+            schema = options[0] if options else {}
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            key: fake_value(value, key, defs, words)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        item = schema.get("items", {})
+        if item.get("type", "string") == "string":
+            return [f"{name} {i}" for i in range(3)]
+        return [fake_value(item, name, defs, words) for _ in range(3)]
+    if kind == "integer":
+        return 3
+    if kind == "number":
+        return 0.5
+    if kind == "boolean":
+        return True
+    return text(words, name)
+
+
+def plan_reply(body: dict, config: StubConfig):
+    """Decide between a tool call and a text answer for this request."""
+
+    tools = body.get("tools") or []
+    messages = body.get("messages") or []
+    tool_choice = body.get("tool_choice")
+    forced = isinstance(tool_choice, dict) or tool_choice in ("required", "any")
+    answered = bool(messages) and messages[-1].get("role") == "tool"
+
+    if tools and (forced or not answered):
+        name = None
+        if isinstance(tool_choice, dict):
+            name = tool_choice.get("function", {}).get("name")
+        tool = next((t for t in tools if t["function"]["name"] == name), tools[0])[
+            "function"
+        ]
+        parameters = tool.get("parameters", {})
+        args = fake_value(
+            parameters, tool["name"], parameters.get("$defs", {}), config.words
+        )
+        return None, {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": tool["name"], "arguments": json.dumps(args)},
+        }
+    return text(config.words, str(len(messages))), None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StubConfig
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.config.lock:
+                self._json(200, dict(self.config.counters))
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        config = self.config
+        config.count(requests=1)
+        body = json.loads(raw or b"{}")
+
+        roll = config.roll()
+        if roll < config.rate_limit_rate:
+            config.count(status_429=1)
+            self._json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                {"Retry-After": f"{config.retry_after:g}"},
+            )
+            return
+        time.sleep(config.delay())
+        if roll < config.rate_limit_rate + config.error_rate:
+            config.count(status_500=1)
+            self._json(500, {"error": {"message": "Injected failure"}})
+            return
+
+        content, tool_call = plan_reply(body, config)
+        usage = {
+            "prompt_tokens": len(raw) // 4,
+            "completion_tokens": len(content or tool_call["function"]["arguments"])
+            // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        cached = config.cached_tokens(
+            json.dumps([body.get("tools"), body.get("messages")])
+        )
+        usage["prompt_tokens_details"] = {"cached_tokens": cached}
+        config.count(
+            status_200=1,
+            tool_calls=bool(tool_call),
+            prompt_tokens=usage["prompt_tokens"],
+            cached_tokens=cached,
+            completion_tokens=usage["completion_tokens"],
+        )
+        if body.get("stream"):
+            config.count(streamed=1)
+            self._stream(body, content, tool_call, usage)
+        else:
+            message = {"role": "assistant", "content": content}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            self._json(
+                200,
+                {
+                    **self._envelope(body, "chat.completion"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": message,
+                            "finish_reason": "tool_calls" if tool_call else "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+
+    def _envelope(self, body: dict, kind: str) -> dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": kind,
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+        }
+
+    def _stream(self, body: dict, content, tool_call, usage: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        envelope = self._envelope(body, "chat.completion.chunk")
+
+        def send(payload):
+            data = f"data: {payload}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def delta(fields, finish_reason=None):
+            choice = {"index": 0, "delta": fields, "finish_reason": finish_reason}
+            send(json.dumps({**envelope, "choices": [choice]}))
+
+        delta({"role": "assistant", "content": ""})
+        if tool_call:
+            arguments = tool_call["function"]["arguments"]
+            head = {**tool_call, "function": {**tool_call["function"], "arguments": ""}}
+            delta({"tool_calls": [{"index": 0, **head}]})
+            pieces = [arguments[i : i + 24] for i in range(0, len(arguments), 24)]
+        else:
+            pieces = [word + " " for word in content.split(" ")]
+        for piece in pieces:
+            time.sleep(self.config.chunk_delay)
+            if tool_call:
+                delta({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+            else:
+                delta({"content": piece})
+        delta({}, "tool_calls" if tool_call else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send(json.dumps({**envelope, "choices": [], "usage": usage}))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under a concurrent burst.
+    request_queue_size = 512
+
+
+def make_server(host: str, port: int, config: StubConfig) -> StubServer:
+    handler = type("Handler", (StubHandler,), {"config": config})
+    return StubServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Latency ± share")
+    parser.add_argument("--chunk-delay", type=float, default=0.005)
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Share of 429 replies"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of 500 replies"
+    )
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--words", type=int, default=60, help="Words per answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--cache-min-tokens",
+        type=int,
+        default=CACHE_MIN_TOKENS,
+        help="Shortest prefix reported as cached",
+    )
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        chunk_delay=args.chunk_delay,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        words=args.words,
+        seed=args.seed,
+        cache_min_tokens=args.cache_min_tokens,
+    )
+    server = make_server(args.host, args.port, config)
+    print(f"Stub listening on http://{args.host}:{server.server_port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""Modules shared by the agent projects.
+
+Each project depends on this package through a uv path source, so a fix
+here reaches every agent at once. The modules read their settings from the
+``.env`` of the working directory (the project being run), not from here.
+"""
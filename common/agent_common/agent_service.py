@@ -0,0 +1,282 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from dotenv import find_dotenv, load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+load_dotenv(find_dotenv(usecwd=True))
+
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8000"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "8"))
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "64"))
+
+# A runner gets the request input and an ``emit`` coroutine for intermediate
+# steps, and returns the final result (anything JSON serialisable).
+Emit = Callable[[str, Any], Awaitable[None]]
+Runner = Callable[[str, Emit], Awaitable[Any]]
+
+_DONE = object()
+
+
+class RunRequest(BaseModel):
+    input: str
+    stream: bool = False
+
+
+def serialize_message(message) -> dict:
+    event = {"type": message.type, "content": message.content}
+    if getattr(message, "tool_calls", None):
+        event["tool_calls"] = [
+            {"name": call["name"], "args": call["args"], "id": call.get("id")}
+            for call in message.tool_calls
+        ]
+    if getattr(message, "name", None):
+        event["name"] = message.name
+    return event
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, input: str, stream: bool):
+        self.id = next(self._ids)
+        self.input = input
+        self.stream = stream
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self.submitted = time.monotonic()
+
+    async def emit(self, event: str, data: Any = None):
+        if self.stream:
+            await self.events.put((event, data))
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+        elif not self.result.done():
+            self.result.cancel()
+
+
+class AgentService:
+    """Bounded job queue in front of a fixed pool of async workers.
+
+    Submissions beyond ``queue_size`` waiting jobs are rejected instead of
+    piling up, so an overloaded service answers 503 quickly rather than
+    timing everybody out.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        workers: int = SERVICE_WORKERS,
+        queue_size: int = SERVICE_QUEUE_SIZE,
+    ):
+        self.runner = runner
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.running = 0
+        self.counters = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+        }
+        self.queue_wait_total = 0.0
+        self.run_time_total = 0.0
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"agent-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, input: str, stream: bool = False) -> Job:
+        job = Job(input, stream)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            raise
+        self.counters["submitted"] += 1
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                if not job.result.done():
+                    await self._run(job)
+                else:
+                    # Cancelled while it waited in the queue.
+                    self.counters["cancelled"] += 1
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: Job):
+        started = time.monotonic()
+        self.queue_wait_total += started - job.submitted
+        self.running += 1
+        await job.emit("started", {"job": job.id})
+        job.task = asyncio.create_task(self.runner(job.input, job.emit))
+        try:
+            result = await job.task
+        except asyncio.CancelledError:
+            self.counters["cancelled"] += 1
+            if not job.result.done():
+                job.result.cancel()
+            if asyncio.current_task().cancelling():
+                # The worker itself is being cancelled (shutdown).
+                raise
+        except Exception as e:
+            self.counters["failed"] += 1
+            error = f"{type(e).__name__}: {e}"
+            await job.emit("error", {"error": error})
+            # Streamed jobs report errors as events; nobody awaits the future.
+            if job.stream:
+                job.result.set_result(None)
+            else:
+                job.result.set_exception(e)
+        else:
+            self.counters["completed"] += 1
+            await job.emit("result", result)
+            job.result.set_result(result)
+        finally:
+            self.running -= 1
+            self.run_time_total += time.monotonic() - started
+            await job.events.put((_DONE, None))
+
+    def stats(self) -> dict:
+        finished = sum(self.counters[k] for k in ("completed", "failed", "cancelled"))
+        return {
+            **self.counters,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "running": self.running,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "avg_queue_wait_s": round(
+                self.queue_wait_total / max(finished + self.running, 1), 3
+            ),
+            "avg_run_s": round(self.run_time_total / max(finished, 1), 3),
+        }
+
+
+async def sse(job: Job) -> AsyncIterator[str]:
+    try:
+        yield f"event: queued\ndata: {json.dumps({'job': job.id})}\n\n"
+        while True:
+            event, data = await job.events.get()
+            if event is _DONE:
+                return
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    finally:
+        # The client went away: stop paying for a run nobody will read.
+        if not job.result.done():
+            job.cancel()
+
+
+async def disconnected(request: Request) -> None:
+    """Return once the client of ``request`` has gone away."""
+
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def wait_result(job: Job, request: Request) -> Any:
+    """The job's result, cancelling the job if the client goes away first."""
+
+    watcher = asyncio.create_task(disconnected(request))
+    try:
+        await asyncio.wait({job.result, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not job.result.done():
+            # The client went away (or this handler was cancelled): stop
+            # paying for a run nobody will read.
+            job.cancel()
+    if not job.result.done():
+        raise asyncio.CancelledError()
+    return job.result.result()
+
+
+def create_app(
+    service: AgentService,
+    title: str,
+    warm: Optional[Callable[[], Any]] = None,
+    stats: Optional[Callable[[], dict]] = None,
+) -> FastAPI:
+    """FastAPI app serving ``service``.
+
+    ``warm`` runs once at startup to build the LLM, search clients and graph
+    before the first request; ``stats`` adds agent-specific counters to
+    GET /stats.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if warm:
+            warm()
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.stop()
+
+    app = FastAPI(title=title, lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def get_stats():
+        return {"service": service.stats(), **(stats() if stats else {})}
+
+    @app.post("/runs")
+    async def run(run_request: RunRequest, request: Request):
+        try:
+            job = service.submit(run_request.input, run_request.stream)
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Service is at capacity, retry later.",
+                headers={"Retry-After": "1"},
+            )
+        if run_request.stream:
+            return StreamingResponse(
+                sse(job),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+        try:
+            result = await wait_result(job, request)
+        except asyncio.CancelledError:
+            raise HTTPException(status_code=499, detail="Run was cancelled.")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
+        return {"job": job.id, "result": result}
+
+    return app
+
+
+def serve(app: FastAPI, host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+    import uvicorn
+
+    uvicorn.run(app, host=host, port=port)
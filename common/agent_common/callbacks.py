@@ -0,0 +1,336 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from agent_common.llm_cache import CACHE_HIT
+from agent_common.rate_limiter import limiter
+from dotenv import find_dotenv, load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+load_dotenv(find_dotenv(usecwd=True))
+
+
+class AgentCallbackHandler(BaseCallbackHandler):
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any
+    ) -> Any:
+        """Run when LLM starts running."""
+        print(f"***Prompt to LLM was:***\n{prompts[0]}")
+        print("*********")
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> Any:
+        """Run when LLM ends running."""
+        print(f"***LLM Response:***\n{response.generations[0][0].text}")
+        print("*********")
+
+
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH", "metrics.jsonl")
+METRICS_PROM_PATH = os.getenv("METRICS_PROM_PATH", "metrics.prom")
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5.0"))
+
+_STOP = object()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record LLM and tool timings without blocking the calling thread.
+
+    Callbacks only take timestamps and push finished records onto a queue; a
+    background thread appends them to a JSONL file and periodically rewrites
+    a Prometheus text-format file with the running totals.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: Optional[str] = METRICS_JSONL_PATH,
+        prom_path: Optional[str] = METRICS_PROM_PATH,
+        sample_rate: float = METRICS_SAMPLE_RATE,
+        flush_interval: float = METRICS_FLUSH_INTERVAL,
+    ):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+
+        self._llm_starts: Dict[UUID, float] = {}
+        self._first_tokens: Dict[UUID, float] = {}
+        self._tool_starts: Dict[UUID, Tuple[str, float]] = {}
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._totals: Dict[str, float] = defaultdict(float)
+        self._tool_totals: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+
+        self._writer = threading.Thread(
+            target=self._drain, name="metrics-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> Any:
+        if self._sampled():
+            self._llm_starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> Any:
+        if self._sampled():
+            self._llm_starts[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        if run_id in self._llm_starts and run_id not in self._first_tokens:
+            self._first_tokens[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        started = self._llm_starts.pop(run_id, None)
+        if started is None:
+            return
+        ended = time.perf_counter()
+        first_token = self._first_tokens.pop(run_id, None)
+        if _from_cache(response):
+            # A replayed response: no request was made and no tokens billed.
+            self._queue.put(
+                {"type": "cache_hit", "ts": time.time(), "run_id": str(run_id)}
+            )
+            return
+        prompt_tokens, completion_tokens, cached_tokens = _token_counts(response)
+        self._queue.put(
+            {
+                "type": "llm",
+                "ts": time.time(),
+                "run_id": str(run_id),
+                "latency_s": ended - started,
+                "ttft_s": first_token - started if first_token else None,
+                "prompt_tokens": prompt_tokens,
+                "cached_prompt_tokens": cached_tokens,
+                "completion_tokens": completion_tokens,
+                "error": None,
+            }
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        if isinstance(error, GeneratorExit):
+            # The caller closed the stream on purpose (e.g. once a ReAct action
+            # is complete): a finished call with whatever usage arrived.
+            response = kwargs.get("response") or LLMResult(generations=[])
+            self.on_llm_end(response, run_id=run_id)
+            return
+        started = self._llm_starts.pop(run_id, None)
+        self._first_tokens.pop(run_id, None)
+        if started is None:
+            return
+        self._queue.put(
+            {
+                "type": "llm",
+                "ts": time.time(),
+                "run_id": str(run_id),
+                "latency_s": time.perf_counter() - started,
+                "ttft_s": None,
+                "prompt_tokens": 0,
+                "cached_prompt_tokens": 0,
+                "completion_tokens": 0,
+                "error": type(error).__name__,
+            }
+        )
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> Any:
+        if self._sampled():
+            name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+            self._tool_starts[run_id] = (name, time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end_tool(run_id, None)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> Any:
+        self._end_tool(run_id, type(error).__name__)
+
+    def _end_tool(self, run_id: UUID, error: Optional[str]) -> None:
+        started = self._tool_starts.pop(run_id, None)
+        if started is None:
+            return
+        name, started_at = started
+        self._queue.put(
+            {
+                "type": "tool",
+                "ts": time.time(),
+                "run_id": str(run_id),
+                "name": name,
+                "duration_s": time.perf_counter() - started_at,
+                "error": error,
+            }
+        )
+
+    def close(self) -> None:
+        """Flush pending records and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=self.flush_interval + 5)
+
+    def _drain(self) -> None:
+        sink = open(self.jsonl_path, "a", encoding="utf-8") if self.jsonl_path else None
+        next_flush = time.monotonic() + self.flush_interval
+        dirty = False
+        try:
+            while True:
+                timeout = max(next_flush - time.monotonic(), 0.0)
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    record = None
+
+                if record is _STOP:
+                    break
+                if record is not None:
+                    self._aggregate(record)
+                    dirty = True
+                    if sink:
+                        sink.write(json.dumps(record) + "\n")
+
+                if time.monotonic() >= next_flush:
+                    if sink:
+                        sink.flush()
+                    if dirty:
+                        self._write_prometheus()
+                        dirty = False
+                    next_flush = time.monotonic() + self.flush_interval
+        finally:
+            if sink:
+                sink.close()
+            self._write_prometheus()
+
+    def _aggregate(self, record: Dict[str, Any]) -> None:
+        totals = self._totals
+        if record["type"] == "llm":
+            totals["llm_calls"] += 1
+            totals["llm_errors"] += bool(record["error"])
+            totals["llm_latency_sum"] += record["latency_s"]
+            if record["ttft_s"] is not None:
+                totals["llm_ttft_sum"] += record["ttft_s"]
+                totals["llm_ttft_count"] += 1
+            totals["prompt_tokens"] += record["prompt_tokens"]
+            totals["cached_prompt_tokens"] += record["cached_prompt_tokens"]
+            totals["completion_tokens"] += record["completion_tokens"]
+        elif record["type"] == "cache_hit":
+            totals["cache_hits"] += 1
+        elif record["type"] == "tool":
+            tool = self._tool_totals[record["name"]]
+            tool["calls"] += 1
+            tool["errors"] += bool(record["error"])
+            tool["duration_sum"] += record["duration_s"]
+
+    def _write_prometheus(self) -> None:
+        if not self.prom_path:
+            return
+        t = self._totals
+        lines = [
+            "# TYPE agent_llm_calls_total counter",
+            f"agent_llm_calls_total {t['llm_calls']:g}",
+            "# TYPE agent_llm_errors_total counter",
+            f"agent_llm_errors_total {t['llm_errors']:g}",
+            "# TYPE agent_llm_cache_hits_total counter",
+            f"agent_llm_cache_hits_total {t['cache_hits']:g}",
+            # Every LLM retry happens in the rate limiter (the SDK clients run
+            # with max_retries=0); its counter covers the whole process.
+            "# TYPE agent_llm_retries_total counter",
+            f"agent_llm_retries_total {limiter.stats()['retries']:g}",
+            "# TYPE agent_llm_latency_seconds summary",
+            f"agent_llm_latency_seconds_sum {t['llm_latency_sum']:.6f}",
+            f"agent_llm_latency_seconds_count {t['llm_calls']:g}",
+            "# TYPE agent_llm_ttft_seconds summary",
+            f"agent_llm_ttft_seconds_sum {t['llm_ttft_sum']:.6f}",
+            f"agent_llm_ttft_seconds_count {t['llm_ttft_count']:g}",
+            "# TYPE agent_llm_prompt_tokens_total counter",
+            f"agent_llm_prompt_tokens_total {t['prompt_tokens']:g}",
+            "# TYPE agent_llm_cached_prompt_tokens_total counter",
+            f"agent_llm_cached_prompt_tokens_total {t['cached_prompt_tokens']:g}",
+            "# TYPE agent_llm_completion_tokens_total counter",
+            f"agent_llm_completion_tokens_total {t['completion_tokens']:g}",
+            "# TYPE agent_tool_calls_total counter",
+            "# TYPE agent_tool_errors_total counter",
+            "# TYPE agent_tool_duration_seconds summary",
+        ]
+        for name, tool in sorted(self._tool_totals.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines += [
+                f'agent_tool_calls_total{{tool="{label}"}} {tool["calls"]:g}',
+                f'agent_tool_errors_total{{tool="{label}"}} {tool["errors"]:g}',
+                f'agent_tool_duration_seconds_sum{{tool="{label}"}} '
+                f'{tool["duration_sum"]:.6f}',
+                f'agent_tool_duration_seconds_count{{tool="{label}"}} '
+                f'{tool["calls"]:g}',
+            ]
+        # Write then rename so scrapers never read a half-written file.
+        tmp_path = f"{self.prom_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prom_path)
+
+
+def _from_cache(response: LLMResult) -> bool:
+    return any(
+        (generation.generation_info or {}).get(CACHE_HIT)
+        for generations in response.generations
+        for generation in generations
+    )
+
+
+def _token_counts(response: LLMResult) -> Tuple[int, int, int]:
+    """Prompt, completion and cached prompt tokens of one LLM call.
+
+    Cached tokens are the part of the prompt the provider served from its
+    prefix cache (OpenAI's ``prompt_tokens_details.cached_tokens``).
+    """
+
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        details = usage.get("prompt_tokens_details") or {}
+        return (
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+            details.get("cached_tokens") or 0,
+        )
+    prompt_tokens = completion_tokens = cached_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage_metadata:
+                prompt_tokens += usage_metadata.get("input_tokens", 0)
+                completion_tokens += usage_metadata.get("output_tokens", 0)
+                details = usage_metadata.get("input_token_details") or {}
+                cached_tokens += details.get("cache_read", 0)
+    return prompt_tokens, completion_tokens, cached_tokens
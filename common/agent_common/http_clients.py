@@ -0,0 +1,184 @@
+import atexit
+import importlib.util
+import os
+import threading
+import warnings
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+from agent_common.rate_limiter import limiter
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(usecwd=True))
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+HTTP2 = os.getenv("HTTP2", "0") == "1"
+
+
+class PoolMetrics:
+    """Counts requests against new TCP connections and TLS handshakes.
+
+    Failed requests (transport errors and 4xx/5xx) count as errors.
+    Connections are observed through httpcore's ``trace`` request extension,
+    so a request that shows no ``connect_tcp`` event went over a kept-alive
+    connection from the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.errors = 0
+
+    def _count(self, name: str):
+        if name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+        elif name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def trace(self, name: str, info: dict):
+        self._count(name)
+
+    async def atrace(self, name: str, info: dict):
+        self._count(name)
+
+    def request_started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self, response: Optional[httpx.Response]):
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += response is None or response.status_code >= 400
+
+    def stats(self) -> dict:
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_rate": (
+                    round(reused / self.requests, 3) if self.requests else 0.0
+                ),
+                "errors": self.errors,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def http2_enabled() -> bool:
+    if HTTP2 and importlib.util.find_spec("h2") is None:
+        warnings.warn("HTTP2=1 needs the 'h2' package; falling back to HTTP/1.1")
+        return False
+    return HTTP2
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=HTTP_READ_TIMEOUT,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT,
+    )
+
+
+class MeteredTransport(httpx.HTTPTransport):
+    """Counts pool usage and sends LLM calls through the shared rate limiter."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if limiter.applies(request):
+            return limiter.send(request, self._send)
+        return self._send(request)
+
+    def _send(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = pool_metrics.trace
+        pool_metrics.request_started()
+        response = None
+        try:
+            response = super().handle_request(request)
+            return response
+        finally:
+            pool_metrics.request_finished(response)
+
+
+class AsyncMeteredTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if limiter.applies(request):
+            return await limiter.asend(request, self._send)
+        return await self._send(request)
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = pool_metrics.atrace
+        pool_metrics.request_started()
+        response = None
+        try:
+            response = await super().handle_async_request(request)
+            return response
+        finally:
+            pool_metrics.request_finished(response)
+
+
+# One client per TLS setting for the whole process, so every ChatOpenAI
+# instance and tool shares the same keep-alive pool instead of opening (and
+# handshaking) its own connections.
+@lru_cache(maxsize=None)
+def get_http_client(verify: bool = True) -> httpx.Client:
+    client = httpx.Client(
+        transport=MeteredTransport(
+            verify=verify, http2=http2_enabled(), limits=_limits()
+        ),
+        timeout=_timeout(),
+    )
+    atexit.register(client.close)
+    return client
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client(verify: bool = True) -> httpx.AsyncClient:
+    """Async counterpart of ``get_http_client``.
+
+    Pooled connections belong to the event loop that opened them, so the
+    client is meant for a process that runs a single loop (``asyncio.run``
+    once, or a server).
+    """
+
+    return httpx.AsyncClient(
+        transport=AsyncMeteredTransport(
+            verify=verify, http2=http2_enabled(), limits=_limits()
+        ),
+        timeout=_timeout(),
+    )
+
+
+def pool_stats() -> dict:
+    return pool_metrics.stats()
+
+
+def rate_limit_stats() -> dict:
+    return limiter.stats()
@@ -0,0 +1,190 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+
+from dotenv import find_dotenv, load_dotenv
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+load_dotenv(find_dotenv(usecwd=True))
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")  # "" keeps the cache in memory
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+# generation_info flag on responses served from the cache, so callbacks can
+# tell them from real (billed) calls.
+CACHE_HIT = "llm_cache_hit"
+
+_bypass_var: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "llm_cache_bypass", default=False
+)
+
+
+class LLMResponseCache(BaseCache):
+    """Exact-match cache for chat model responses.
+
+    LangChain hands the cache the serialized messages as ``prompt`` and the
+    model settings as ``llm_string``; the latter already includes the model
+    name, ``extra_body`` and the ``tools``/``tool_choice`` passed through
+    ``bind_tools``, so hashing both gives the full request identity.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH or None,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        bypass: bool = LLM_CACHE_BYPASS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._conn = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at "
+                    "ON llm_cache (accessed_at)"
+                )
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def _skip(self) -> bool:
+        if self.bypass or _bypass_var.get():
+            with self._lock:
+                self.bypassed += 1
+            return True
+        return False
+
+    @contextlib.contextmanager
+    def bypassed_calls(self) -> Iterator[None]:
+        """Skip the cache for calls made inside this block."""
+        token = _bypass_var.set(True)
+        try:
+            yield
+        finally:
+            _bypass_var.reset(token)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self._skip():
+            return None
+
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            if self._conn is None:
+                raw = self._memory.get(key)
+                if raw is not None:
+                    self._memory.move_to_end(key)
+            else:
+                with self._conn:
+                    row = self._conn.execute(
+                        "SELECT response FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    raw = row[0] if row else None
+                    if raw is not None:
+                        self._conn.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                            (time.time(), key),
+                        )
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [
+            ChatGeneration(
+                message=messages_from_dict([gen["message"]])[0],
+                generation_info={**(gen["generation_info"] or {}), CACHE_HIT: True},
+            )
+            for gen in json.loads(raw)
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.bypass or _bypass_var.get():
+            return
+
+        key = self.make_key(prompt, llm_string)
+        raw = json.dumps(
+            [
+                {
+                    "message": message_to_dict(gen.message),
+                    "generation_info": gen.generation_info,
+                }
+                for gen in return_val
+            ]
+        )
+        with self._lock:
+            if self._conn is None:
+                self._memory[key] = raw
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+                    self.evictions += 1
+            else:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)",
+                        (key, raw, time.time()),
+                    )
+                    evicted = self._conn.execute(
+                        """
+                        DELETE FROM llm_cache WHERE key IN (
+                            SELECT key FROM llm_cache ORDER BY accessed_at DESC
+                            LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.max_entries,),
+                    ).rowcount
+                    self.evictions += max(evicted, 0)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._conn is None:
+                size = len(self._memory)
+            else:
+                (size,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM llm_cache"
+                ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "size": size,
+        }
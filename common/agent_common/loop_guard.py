@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(usecwd=True))
+
+# Model turns one run may take before it is stopped.
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "10"))
+# Wall-clock budget of one run in seconds (0 = no limit).
+AGENT_MAX_SECONDS = float(os.getenv("AGENT_MAX_SECONDS", "300"))
+# How often the same (tool, args) call may be repeated before the run stops.
+AGENT_MAX_REPEATS = int(os.getenv("AGENT_MAX_REPEATS", "2"))
+# Consecutive turns that only repeat earlier calls before the run stops.
+AGENT_MAX_STALLED_STEPS = int(os.getenv("AGENT_MAX_STALLED_STEPS", "2"))
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _lock:
+        _stats[key] += n
+
+
+def normalize_args(args: Any) -> str:
+    """Canonical form of tool arguments: sorted keys, trimmed strings."""
+
+    def normalize(value):
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    return json.dumps(normalize(args), sort_keys=True, default=str)
+
+
+def repeat_note(tool_name: str) -> str:
+    return (
+        f"Note: {tool_name} was already called with these arguments and the "
+        "result above will not change. Do not call it again; use the results "
+        "you have to give the final answer, or try something different."
+    )
+
+
+class ToolMemo:
+    """Per-run results of pure tools, keyed by tool name and normalized args."""
+
+    def __init__(self, is_pure: Callable[[str], bool]):
+        self.is_pure = is_pure
+        self._results: Dict[Tuple[str, str], Any] = {}
+
+    def call(self, tool_name: str, args: Any, run: Callable[[], Any]) -> Any:
+        if not self.is_pure(tool_name):
+            return run()
+        key = (tool_name, normalize_args(args))
+        if key in self._results:
+            _count("memo_hits")
+            return self._results[key]
+        _count("memo_misses")
+        result = self._results[key] = run()
+        return result
+
+    async def acall(
+        self, tool_name: str, args: Any, run: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        if not self.is_pure(tool_name):
+            return await run()
+        key = (tool_name, normalize_args(args))
+        if key in self._results:
+            _count("memo_hits")
+            return self._results[key]
+        _count("memo_misses")
+        result = self._results[key] = await run()
+        return result
+
+
+class LoopGuard:
+    """Step and time budgets plus repeated-action detection for one run.
+
+    Call ``over_budget`` before every model turn and ``check_actions`` with
+    the tool calls it produced. A repeated call is flagged so the agent can
+    steer the model away from it; a call repeated more than ``max_repeats``
+    times, or ``max_stalled`` turns in a row made only of repeats, end the run.
+    """
+
+    def __init__(
+        self,
+        max_steps: int = AGENT_MAX_STEPS,
+        max_seconds: float = AGENT_MAX_SECONDS,
+        max_repeats: int = AGENT_MAX_REPEATS,
+        max_stalled: int = AGENT_MAX_STALLED_STEPS,
+    ):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_repeats = max_repeats
+        self.max_stalled = max_stalled
+        self.started = time.monotonic()
+        self.steps = 0
+        self.stalled = 0
+        self._seen = Counter()
+
+    def over_budget(self) -> Optional[str]:
+        """Count a model turn; returns why the run must stop, if it must."""
+
+        if self.steps >= self.max_steps:
+            return self._stop(f"step budget of {self.max_steps} turns used up")
+        elapsed = time.monotonic() - self.started
+        if self.max_seconds and elapsed > self.max_seconds:
+            return self._stop(f"time budget of {self.max_seconds:g}s used up")
+        self.steps += 1
+        return None
+
+    def is_new(self, tool_name: str, args: Any) -> bool:
+        """Whether no earlier turn made this call.
+
+        A new call can neither stop the run nor be flagged as a repeat, so it
+        is safe to start before its turn reaches ``check_actions``.
+        """
+
+        return self._seen[(tool_name, normalize_args(args))] == 0
+
+    def check_actions(
+        self, actions: List[Tuple[str, Any]]
+    ) -> Tuple[Optional[str], List[bool]]:
+        """Record one turn's (tool, args) calls.
+
+        Returns the reason to stop (or None) and, per call, whether it
+        repeats an earlier one.
+        """
+
+        repeated = []
+        for tool_name, args in actions:
+            key = (tool_name, normalize_args(args))
+            repeated.append(self._seen[key] > 0)
+            self._seen[key] += 1
+            if self._seen[key] > self.max_repeats + 1:
+                return self._stop(f"{tool_name} repeated with the same input"), repeated
+
+        if any(repeated):
+            _count("steered")
+        if actions and all(repeated):
+            self.stalled += 1
+            if self.stalled >= self.max_stalled:
+                return (
+                    self._stop(f"no progress in {self.stalled} turns"),
+                    repeated,
+                )
+        else:
+            self.stalled = 0
+        return None, repeated
+
+    @staticmethod
+    def _stop(reason: str) -> str:
+        _count("stopped")
+        return reason
+
+
+def loop_stats() -> Dict[str, int]:
+    with _lock:
+        return {
+            "memo_hits": _stats["memo_hits"],
+            "memo_misses": _stats["memo_misses"],
+            "steered": _stats["steered"],
+            "stopped": _stats["stopped"],
+        }
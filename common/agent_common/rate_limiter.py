@@ -0,0 +1,346 @@
+import asyncio
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(usecwd=True))
+
+# 0 disables the corresponding bucket.
+RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", "0"))
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "32"))
+RATE_LIMIT_MIN_CONCURRENCY = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", "1"))
+# Requests slower than this (seconds) shrink the concurrency limit; 0 disables.
+RATE_LIMIT_LATENCY_TARGET = float(os.getenv("RATE_LIMIT_LATENCY_TARGET", "60"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+RATE_LIMIT_MAX_BACKOFF = float(os.getenv("RATE_LIMIT_MAX_BACKOFF", "60"))
+
+LIMITED_PATHS = ("/chat/completions", "/completions", "/responses", "/embeddings")
+RETRY_STATUSES = (429, 503)
+# Other failures worth another attempt: what the OpenAI SDK retries itself.
+# The LLM clients run with max_retries=0, so this is the only retry layer.
+TRANSIENT_STATUSES = (408, 409, 500, 502, 504)
+_POLL_INTERVAL = 0.05
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, starting full."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` and return how long the caller must wait for it.
+
+        The balance may go negative, which makes later callers queue behind
+        this reservation instead of racing it.
+        """
+
+        if self.capacity <= 0:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the whole bucket would otherwise never fit.
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Rough token cost of a completion request: prompt bytes / 4 + output cap."""
+
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        return 0
+    tokens = len(body) // 4
+    try:
+        payload = json.loads(body)
+        tokens += int(
+            payload.get("max_completion_tokens") or payload.get("max_tokens") or 0
+        )
+    except (ValueError, AttributeError, TypeError):
+        pass
+    return tokens
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds the server asked us to wait, if it said so."""
+
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class RateLimiter:
+    """Process-wide gate in front of the LLM endpoint.
+
+    A request needs a concurrency slot plus one request and its estimated
+    tokens from the RPM/TPM buckets. The concurrency limit follows AIMD: it
+    grows by roughly one per window of successful requests and is halved on
+    429/5xx responses or transport errors (cut by 10% on slow responses). A
+    429/503 pauses every caller for the Retry-After delay before the request
+    is retried, so one throttled call does not turn into a burst of retries.
+
+    The slot is held until the response body is closed, so streamed
+    completions count for their whole duration.
+    """
+
+    def __init__(
+        self,
+        rpm: float = RATE_LIMIT_RPM,
+        tpm: float = RATE_LIMIT_TPM,
+        max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+        min_concurrency: int = RATE_LIMIT_MIN_CONCURRENCY,
+        latency_target: float = RATE_LIMIT_LATENCY_TARGET,
+        max_retries: int = RATE_LIMIT_MAX_RETRIES,
+    ):
+        self._lock = threading.Lock()
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.throttled = 0
+        self.retries = 0
+        self.waited = 0.0
+
+    def applies(self, request: httpx.Request) -> bool:
+        return request.method == "POST" and request.url.path.endswith(LIMITED_PATHS)
+
+    def _try_enter(self) -> float:
+        """Take a concurrency slot, or return how long to wait before retrying."""
+
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return _POLL_INTERVAL
+            self.in_flight += 1
+            return 0.0
+
+    def _reserve(self, request: httpx.Request) -> float:
+        tokens = estimate_tokens(request)
+        with self._lock:
+            now = time.monotonic()
+            return max(
+                self.request_bucket.reserve(1, now),
+                self.token_bucket.reserve(tokens, now),
+            )
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _exit(self, started: float, status: int):
+        """Release the slot and adjust the limit; ``status`` 0 is a transport error."""
+
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.throttled += status in RETRY_STATUSES
+            if status == 0 or status in RETRY_STATUSES or status >= 500:
+                factor = 0.5
+            elif self.latency_target and now - started > self.latency_target:
+                factor = 0.9
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                return
+            # Requests sent before the last cut saw the old limit; letting
+            # each of them cut again would collapse the limit after one burst.
+            if started > self.decreased_at:
+                self.limit = max(self.min_concurrency, self.limit * factor)
+                self.decreased_at = now
+
+    def _retry_delay(self, response: Optional[httpx.Response], attempt: int) -> float:
+        delay = retry_after(response) if response is not None else None
+        if delay is None:
+            delay = 2**attempt + random.uniform(0, 1)
+        with self._lock:
+            self.retries += 1
+        return min(delay, RATE_LIMIT_MAX_BACKOFF)
+
+    def _backoff(self, response: httpx.Response, attempt: int):
+        """Throttling concerns the whole endpoint, so every request pauses."""
+
+        delay = self._retry_delay(response, attempt)
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def _waited(self, seconds: float):
+        with self._lock:
+            self.waited += seconds
+
+    def send(
+        self,
+        request: httpx.Request,
+        send: Callable[[httpx.Request], httpx.Response],
+    ) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            while (delay := self._try_enter()) > 0:
+                time.sleep(delay)
+                self._waited(delay)
+            try:
+                if delay := self._reserve(request):
+                    time.sleep(delay)
+                    self._waited(delay)
+            except BaseException:
+                self._leave()
+                raise
+
+            started = time.monotonic()
+            try:
+                response = send(request)
+            except httpx.TransportError:
+                self._exit(started, 0)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(None, attempt))
+                continue
+            except Exception:
+                self._exit(started, 0)
+                raise
+            except BaseException:
+                # Cancelled or interrupted: not the endpoint's fault.
+                self._leave()
+                raise
+
+            status = response.status_code
+            if status in TRANSIENT_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._exit(started, status)
+                time.sleep(self._retry_delay(response, attempt))
+                continue
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._exit(started, status)
+                self._backoff(response, attempt)
+                continue
+            response.stream = _ReleasingStream(
+                response.stream, lambda: self._exit(started, status)
+            )
+            return response
+
+    async def asend(
+        self,
+        request: httpx.Request,
+        send: Callable[[httpx.Request], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            while (delay := self._try_enter()) > 0:
+                await asyncio.sleep(delay)
+                self._waited(delay)
+            try:
+                if delay := self._reserve(request):
+                    await asyncio.sleep(delay)
+                    self._waited(delay)
+            except BaseException:
+                self._leave()
+                raise
+
+            started = time.monotonic()
+            try:
+                response = await send(request)
+            except httpx.TransportError:
+                self._exit(started, 0)
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(None, attempt))
+                continue
+            except Exception:
+                self._exit(started, 0)
+                raise
+            except BaseException:
+                # Cancelled or interrupted: not the endpoint's fault.
+                self._leave()
+                raise
+
+            status = response.status_code
+            if status in TRANSIENT_STATUSES and attempt < self.max_retries:
+                await response.aclose()
+                self._exit(started, status)
+                await asyncio.sleep(self._retry_delay(response, attempt))
+                continue
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                await response.aclose()
+                self._exit(started, status)
+                self._backoff(response, attempt)
+                continue
+            response.stream = _AsyncReleasingStream(
+                response.stream, lambda: self._exit(started, status)
+            )
+            return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "waited_s": round(self.waited, 3),
+            }
+
+
+limiter = RateLimiter()
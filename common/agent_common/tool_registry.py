@@ -0,0 +1,88 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from langchain_core.tools import BaseTool, render_text_description
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel
+
+
+class ToolRegistry:
+    """Name-indexed tool collection shared by the agent loops.
+
+    Everything derived from the tool list (prompt description, OpenAI tool
+    schemas, argument validators) is built once and reused until the next
+    ``register`` call. Tools named in ``pure`` depend only on their
+    arguments, so the agent loops may reuse their results within a run.
+    """
+
+    def __init__(self, tools: Iterable[BaseTool] = (), pure: Iterable[str] = ()):
+        self._tools: Dict[str, BaseTool] = {}
+        self._validators: Dict[str, Optional[type[BaseModel]]] = {}
+        self._pure: Set[str] = set()
+        self._text_description: Optional[str] = None
+        self._openai_schemas: Optional[List[Dict[str, Any]]] = None
+        pure = set(pure)
+        for tool in tools:
+            self.register(tool, pure=tool.name in pure)
+
+    def register(self, tool: BaseTool, pure: bool = False) -> BaseTool:
+        if tool.name in self._tools:
+            raise ValueError(f"Tool with name {tool.name} is already registered.")
+        self._tools[tool.name] = tool
+        if pure:
+            self._pure.add(tool.name)
+        # BaseTool.tool_call_schema builds a new pydantic model on every
+        # access, so resolve it once here instead of on each dispatch.
+        schema = tool.tool_call_schema
+        self._validators[tool.name] = (
+            schema
+            if isinstance(schema, type) and issubclass(schema, BaseModel)
+            else None
+        )
+        self._text_description = None
+        self._openai_schemas = None
+        return tool
+
+    def get(self, tool_name: str) -> BaseTool:
+        try:
+            return self._tools[tool_name]
+        except KeyError:
+            raise ValueError(f"Tool with name {tool_name} not found.") from None
+
+    def validate(self, tool_name: str, tool_args: Any) -> Any:
+        """Check tool call arguments against the tool schema.
+
+        Raises ``pydantic.ValidationError`` when the arguments do not fit.
+        """
+        validator = self._validators.get(tool_name)
+        if validator is not None and isinstance(tool_args, dict):
+            validator.model_validate(tool_args)
+        return tool_args
+
+    def is_pure(self, tool_name: str) -> bool:
+        return tool_name in self._pure
+
+    @property
+    def tools(self) -> List[BaseTool]:
+        return list(self._tools.values())
+
+    def tool_names(self) -> str:
+        return ", ".join(self._tools)
+
+    def text_description(self) -> str:
+        if self._text_description is None:
+            self._text_description = render_text_description(self.tools)
+        return self._text_description
+
+    def openai_schemas(self) -> List[Dict[str, Any]]:
+        if self._openai_schemas is None:
+            self._openai_schemas = [convert_to_openai_tool(t) for t in self.tools]
+        return self._openai_schemas
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self._tools
+
+    def __iter__(self) -> Iterator[BaseTool]:
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        return len(self._tools)